@@ -1,9 +1,13 @@
 // deno/runner.ts
 //
 // Minimal "Python over stdin/stdout" runner implemented as a long-lived process:
-// - Reads newline-delimited JSON requests from stdin
+// - Reads length-prefixed JSON requests from stdin
 // - Executes Python using Pyodide (WASM)
-// - Writes one JSON response per request to stdout
+// - Writes one length-prefixed JSON response per request to stdout
+//
+// Framing: each message is a 4-byte little-endian unsigned length followed by that
+// many bytes of UTF-8 JSON. stdout carries nothing but frames, so stray Pyodide
+// output is routed to stderr (or dropped) instead of console.log.
 //
 // Designed to be spawned by a Brynhild tool and reused across calls.
 //
@@ -19,7 +23,10 @@ type Request = {
   files?: Record<string, string>;
   packages?: string[];
   pythonpath?: string[];
+  max_output_chars?: number;
   shutdown?: boolean;
+  // Several requests run in order in one round-trip; answered with {"batch": [...]}.
+  batch?: Request[];
 };
 
 type Response =
@@ -70,34 +77,22 @@ function ensureDir(pyodide: any, absPath: string): void {
   }
 }
 
-function buildPythonWrapper(code: string, pythonpath: string[]): string {
-  // P0-B: Use base64 encoding to avoid string delimiter issues.
-  // Raw triple-quotes (r'''...''') break if code contains ''' itself.
-  // Base64 is safe for any content including triple quotes, backslashes, etc.
-  
-  // Handle Unicode: encode to UTF-8 bytes, then base64
-  const encoder = new TextEncoder();
-  const codeBytes = encoder.encode(code);
-  const pathBytes = encoder.encode(JSON.stringify(pythonpath ?? []));
-  
-  // Convert Uint8Array to base64
-  const codeB64 = btoa(String.fromCharCode(...codeBytes));
-  const pathB64 = btoa(String.fromCharCode(...pathBytes));
+// Source-side cap on stdout/stderr/result/traceback when the request doesn't carry one.
+const DEFAULT_OUTPUT_LIMIT = 10000;
 
-  // Capture stdout/stderr and (REPL-like) final expression value.
-  // Returns a JSON string as the final expression.
-  // P1-2.1: Use _LimitedStringIO to bound output at source (prevents memory exhaustion)
-  return `
-import ast, base64, contextlib, io, json, sys, traceback
-
-_code = base64.b64decode("${codeB64}").decode("utf-8")
-_pythonpath = json.loads(base64.b64decode("${pathB64}").decode("utf-8"))
+// Capture stdout/stderr and (REPL-like) final expression value.
+// P0-B: Defined once at startup and called per request with the raw code string, so
+// user code is never spliced into generated Python source and needs no escaping or
+// encoding (triple quotes, backslashes and non-ASCII text pass through untouched).
+// P1-2.1: Use _LimitedStringIO to bound output at source (prevents memory exhaustion)
+const PYTHON_RUNNER = `
+import ast, contextlib, json, sys, traceback
 
 # P1-2.1: Bounded output buffer to prevent memory exhaustion
-# Limit set to 10000 chars (less than python_sandbox._max_output_chars=12000)
-# so the truncation message remains visible after Python-side truncation
+# The limit comes from the tool (kept below its max_output_chars) so output is dropped
+# here instead of being piped back only to be truncated, and the marker stays visible.
 class _LimitedStringIO:
-    def __init__(self, limit=10000):
+    def __init__(self, limit):
         self._buf = []
         self._len = 0
         self._limit = limit
@@ -117,73 +112,268 @@ class _LimitedStringIO:
     def getvalue(self):
         result = "".join(self._buf)
         if self._truncated:
-            result += "\\n... (truncated at source, limit 10000 chars)"
+            result += f"\\n... (truncated at source, limit {self._limit} chars)"
         return result
 
     def flush(self):
         pass  # Required for redirect_stdout compatibility
 
-_stdout = _LimitedStringIO(10000)
-_stderr = _LimitedStringIO(10000)
-_result = None
-_ok = True
-_err = None
-
-_globals = globals().get("__BRYNHILD_USER_GLOBALS__")
-if _globals is None:
-    _globals = {}
-    globals()["__BRYNHILD_USER_GLOBALS__"] = _globals
-
-try:
-    with contextlib.redirect_stdout(_stdout), contextlib.redirect_stderr(_stderr):
-        for p in _pythonpath:
-            if p and p not in sys.path:
-                sys.path.insert(0, p)
-
-        tree = ast.parse(_code, mode="exec")
-        if tree.body and isinstance(tree.body[-1], ast.Expr):
-            last = tree.body.pop()
-            exec(compile(tree, "<sandbox>", "exec"), _globals, _globals)
-            _result = eval(compile(ast.Expression(last.value), "<sandbox>", "eval"), _globals, _globals)
-        else:
-            exec(compile(tree, "<sandbox>", "exec"), _globals, _globals)
-
-    _ok = True
-except Exception:
-    _ok = False
-    _err = traceback.format_exc()
-
-json.dumps({
-    "ok": _ok,
-    "stdout": _stdout.getvalue(),
-    "stderr": _stderr.getvalue(),
-    "result": (repr(_result) if _ok else None),
-    "error": (_err if not _ok else None),
-})
+def _cap(s, limit):
+    # Same source-side bound as stdout/stderr for the result repr and traceback, so a
+    # huge value never crosses the pipe only to be truncated by the tool.
+    if len(s) <= limit:
+        return s
+    return s[:limit] + f"\\n... (truncated at source, limit {limit} chars)"
+
+# User namespace, shared by every request until the process is reset.
+_user_globals = {}
+
+# Compiled (body, final-expression) code objects keyed by source, so re-running the
+# same snippet skips parse + compile. Bounded by entry count and snippet size; lives
+# until the process is reset.
+_compile_cache = {}
+
+def _brynhild_run(_code, _pythonpath, _limit):
+    _stdout = _LimitedStringIO(_limit)
+    _stderr = _LimitedStringIO(_limit)
+    _result = None
+    _err = None
+
+    try:
+        with contextlib.redirect_stdout(_stdout), contextlib.redirect_stderr(_stderr):
+            for p in json.loads(_pythonpath):
+                if p and p not in sys.path:
+                    sys.path.insert(0, p)
+
+            _compiled = _compile_cache.pop(_code, None)
+            if _compiled is None:
+                tree = ast.parse(_code, mode="exec")
+                last = None
+                if tree.body and isinstance(tree.body[-1], ast.Expr):
+                    last = compile(ast.Expression(tree.body.pop().value), "<sandbox>", "eval")
+                _compiled = (compile(tree, "<sandbox>", "exec"), last)
+            if len(_code) <= 65536:
+                # Re-insert at the end: dict order doubles as least-recently-used order.
+                if len(_compile_cache) >= 512:
+                    del _compile_cache[next(iter(_compile_cache))]
+                _compile_cache[_code] = _compiled
+
+            exec(_compiled[0], _user_globals, _user_globals)
+            if _compiled[1] is not None:
+                _result = eval(_compiled[1], _user_globals, _user_globals)
+
+        _ok = True
+    except Exception:
+        _ok = False
+        _err = traceback.format_exc()
+
+    return json.dumps({
+        "ok": _ok,
+        "stdout": _stdout.getvalue(),
+        "stderr": _stderr.getvalue(),
+        "result": (_cap(repr(_result), _limit) if _ok else None),
+        "error": (_cap(_err, _limit) if not _ok else None),
+    })
 `;
-}
 
-async function* iterLines(stream: ReadableStream<Uint8Array>): AsyncGenerator<string> {
-  const decoder = new TextDecoder();
-  let buf = "";
+const FRAME_HEADER_BYTES = 4;
+
+type Frame = {
+  size: number;
+  // null when the frame exceeded maxSize; its bytes were consumed and discarded.
+  body: Uint8Array | null;
+};
+
+async function* iterFrames(
+  stream: ReadableStream<Uint8Array>,
+  maxSize: number,
+): AsyncGenerator<Frame> {
+  let pending = new Uint8Array(0); // partial header carried between chunks
+  let body: Uint8Array | null = null; // frame being filled
+  let size = 0;
+  let filled = 0;
+  let skipping = false;
+
   for await (const chunk of stream) {
-    buf += decoder.decode(chunk, { stream: true });
-    while (true) {
-      const idx = buf.indexOf("\n");
-      if (idx === -1) break;
-      const line = buf.slice(0, idx).replace(/\r$/, "");
-      buf = buf.slice(idx + 1);
-      yield line;
+    let data = chunk;
+    if (pending.length > 0) {
+      data = new Uint8Array(pending.length + chunk.length);
+      data.set(pending, 0);
+      data.set(chunk, pending.length);
+      pending = new Uint8Array(0);
+    }
+
+    let off = 0;
+    while (off < data.length) {
+      if (body === null && !skipping) {
+        if (data.length - off < FRAME_HEADER_BYTES) break;
+        size = new DataView(data.buffer, data.byteOffset + off, FRAME_HEADER_BYTES).getUint32(0, true);
+        off += FRAME_HEADER_BYTES;
+        filled = 0;
+        // Oversized frames are skipped without buffering them.
+        skipping = size > maxSize;
+        if (!skipping) body = new Uint8Array(size);
+      }
+
+      const take = Math.min(size - filled, data.length - off);
+      if (body !== null) body.set(data.subarray(off, off + take), filled);
+      filled += take;
+      off += take;
+
+      if (filled === size) {
+        yield { size, body };
+        body = null;
+        skipping = false;
+      }
+    }
+    if (off < data.length) pending = data.slice(off);
+  }
+}
+
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+async function writeAll(data: Uint8Array): Promise<void> {
+  let off = 0;
+  while (off < data.length) {
+    off += await Deno.stdout.write(data.subarray(off));
+  }
+}
+
+// Takes serialized JSON: the wrapper already returns each Response as JSON text, which
+// is forwarded as-is rather than parsed and re-stringified.
+async function writeFrame(json: string): Promise<void> {
+  const body = encoder.encode(json);
+  const header = new Uint8Array(FRAME_HEADER_BYTES);
+  new DataView(header.buffer).setUint32(0, body.length, true);
+  await writeAll(header);
+  await writeAll(body);
+}
+
+// Run one request against the shared interpreter and return its Response as JSON text.
+// Every failure is reported in the returned Response, so one bad item never aborts a
+// batch.
+// deno-lint-ignore no-explicit-any
+async function handleRequest(pyodide: any, runSnippet: any, req: Request): Promise<string> {
+  const code = typeof req?.code === "string" ? req.code : "";
+  const packages = Array.isArray(req?.packages) ? req.packages : [];
+  const pythonpath = Array.isArray(req?.pythonpath) ? req.pythonpath : [];
+  const files = req?.files && typeof req.files === "object" ? req.files : null;
+  const outputLimit =
+    Number.isInteger(req?.max_output_chars) && (req.max_output_chars as number) > 0
+      ? (req.max_output_chars as number)
+      : DEFAULT_OUTPUT_LIMIT;
+
+  // P1-2.5: File injection limits
+  const MAX_FILES = 100;
+  const MAX_FILE_SIZE = 1_000_000; // 1MB per file
+  const MAX_TOTAL_SIZE = 10_000_000; // 10MB total
+
+  // Validate and pre-encode files (encode once, use for both validation and writing)
+  let fileError: string | null = null;
+  const encodedFiles: Array<{ path: string; absPath: string; data: Uint8Array }> = [];
+  
+  if (files) {
+    const fileEntries = Object.entries(files);
+    if (fileEntries.length > MAX_FILES) {
+      fileError = `Too many files (${fileEntries.length}, max ${MAX_FILES})`;
+    } else {
+      let totalSize = 0;
+      const encoder = new TextEncoder();
+      for (const [path, content] of fileEntries) {
+        if (!path || path.length === 0) {
+          fileError = "Empty file path";
+          break;
+        }
+        
+        let absPath: string;
+        try {
+          absPath = sanitizeWorkPath(path);
+        } catch (e) {
+          fileError = (e as Error).message;
+          break;
+        }
+        
+        const data = encoder.encode(String(content));
+        if (data.length > MAX_FILE_SIZE) {
+          fileError = `File '${path}' too large (${data.length} bytes, max ${MAX_FILE_SIZE})`;
+          break;
+        }
+        totalSize += data.length;
+        encodedFiles.push({ path, absPath, data });
+      }
+      if (!fileError && totalSize > MAX_TOTAL_SIZE) {
+        fileError = `Total file size too large (${totalSize} bytes, max ${MAX_TOTAL_SIZE})`;
+      }
+    }
+  }
+
+  if (fileError) {
+    const resp: Response = {
+      ok: false,
+      stdout: "",
+      stderr: "",
+      result: null,
+      error: fileError,
+    };
+    return JSON.stringify(resp);
+  }
+
+  try {
+    // Load requested packages (if present in the Pyodide distribution).
+    if (packages.length > 0) {
+      // Progress messages would otherwise go to console.log (our frame channel).
+      await pyodide.loadPackage(packages, { messageCallback: () => {} });
+    }
+
+    // Write pre-validated files into /work (already encoded, no double-encoding)
+    for (const { absPath, data } of encodedFiles) {
+      ensureDir(pyodide, absPath);
+      pyodide.FS.writeFile(absPath, data);
+    }
+
+    // Always run in /work.
+    try {
+      pyodide.FS.chdir("/work");
+    } catch (_e) {
+      // ignore
+    }
+
+    // Already a JSON-encoded Response (json.dumps in the wrapper).
+    return runSnippet(code, JSON.stringify(pythonpath), outputLimit);
+  } catch (e) {
+    const resp: Response = {
+      ok: false,
+      stdout: "",
+      stderr: "",
+      result: null,
+      error: (e as Error).message ?? String(e),
+    };
+    return JSON.stringify(resp);
+  }
+}
+
+// Default request size limit when the tool doesn't pass one: 1MB.
+const DEFAULT_MAX_REQUEST_SIZE = 1_000_000;
+
+function maxRequestSize(args: string[]): number {
+  for (const arg of args) {
+    if (arg.startsWith("--max-request-bytes=")) {
+      const n = Number(arg.slice("--max-request-bytes=".length));
+      if (Number.isInteger(n) && n > 0) return n;
     }
   }
-  // Flush final partial line (if any)
-  if (buf.length > 0) yield buf;
+  return DEFAULT_MAX_REQUEST_SIZE;
 }
 
 async function main() {
   // Load Pyodide from vendored local files
   // indexURL is auto-detected from import location (../vendor/pyodide/pyodide.mjs)
-  const pyodide = await loadPyodide();
+  // stdout is reserved for response frames: Python output that escapes the per-request
+  // redirect goes to stderr instead.
+  const pyodide = await loadPyodide({
+    stdout: (msg: string) => console.error(msg),
+  });
 
   // Ensure /work exists and set it as working directory.
   try {
@@ -197,29 +387,31 @@ async function main() {
     // ignore
   }
 
-  // P1-2.1: Request size limit to prevent memory exhaustion
-  const MAX_REQUEST_SIZE = 1_000_000; // 1MB
+  // Define the request wrapper once; requests call it directly with their strings.
+  pyodide.runPython(PYTHON_RUNNER);
+  const runSnippet = pyodide.globals.get("_brynhild_run");
 
-  for await (const rawLine of iterLines(Deno.stdin.readable)) {
-    const line = rawLine.trim();
-    if (!line) continue;
+  // P1-2.1: Request size limit to prevent memory exhaustion. The tool passes its own
+  // cap (BRYNHILD_PYODIDE_MAX_PAYLOAD_BYTES) as --max-request-bytes=N so both sides agree.
+  const MAX_REQUEST_SIZE = maxRequestSize(Deno.args);
 
-    // P1-2.1: Reject oversized requests before parsing
-    if (line.length > MAX_REQUEST_SIZE) {
+  for await (const frame of iterFrames(Deno.stdin.readable, MAX_REQUEST_SIZE)) {
+    // P1-2.1: Oversized requests are rejected before parsing
+    if (frame.body === null) {
       const resp: Response = {
         ok: false,
         stdout: "",
         stderr: "",
         result: null,
-        error: `Request too large (${line.length} bytes, max ${MAX_REQUEST_SIZE})`,
+        error: `Request too large (${frame.size} bytes, max ${MAX_REQUEST_SIZE})`,
       };
-      console.log(JSON.stringify(resp));
+      await writeFrame(JSON.stringify(resp));
       continue;
     }
 
     let req: Request;
     try {
-      req = JSON.parse(line);
+      req = JSON.parse(decoder.decode(frame.body));
     } catch (e) {
       const resp: Response = {
         ok: false,
@@ -228,7 +420,7 @@ async function main() {
         result: null,
         error: `Invalid JSON input: ${(e as Error).message}`,
       };
-      console.log(JSON.stringify(resp));
+      await writeFrame(JSON.stringify(resp));
       continue;
     }
 
@@ -236,102 +428,17 @@ async function main() {
       break;
     }
 
-    const code = typeof req?.code === "string" ? req.code : "";
-    const packages = Array.isArray(req?.packages) ? req.packages : [];
-    const pythonpath = Array.isArray(req?.pythonpath) ? req.pythonpath : [];
-    const files = req?.files && typeof req.files === "object" ? req.files : null;
-
-    // P1-2.5: File injection limits
-    const MAX_FILES = 100;
-    const MAX_FILE_SIZE = 1_000_000; // 1MB per file
-    const MAX_TOTAL_SIZE = 10_000_000; // 10MB total
-
-    // Validate and pre-encode files (encode once, use for both validation and writing)
-    let fileError: string | null = null;
-    const encodedFiles: Array<{ path: string; absPath: string; data: Uint8Array }> = [];
-    
-    if (files) {
-      const fileEntries = Object.entries(files);
-      if (fileEntries.length > MAX_FILES) {
-        fileError = `Too many files (${fileEntries.length}, max ${MAX_FILES})`;
-      } else {
-        let totalSize = 0;
-        const encoder = new TextEncoder();
-        for (const [path, content] of fileEntries) {
-          if (!path || path.length === 0) {
-            fileError = "Empty file path";
-            break;
-          }
-          
-          let absPath: string;
-          try {
-            absPath = sanitizeWorkPath(path);
-          } catch (e) {
-            fileError = (e as Error).message;
-            break;
-          }
-          
-          const data = encoder.encode(String(content));
-          if (data.length > MAX_FILE_SIZE) {
-            fileError = `File '${path}' too large (${data.length} bytes, max ${MAX_FILE_SIZE})`;
-            break;
-          }
-          totalSize += data.length;
-          encodedFiles.push({ path, absPath, data });
-        }
-        if (!fileError && totalSize > MAX_TOTAL_SIZE) {
-          fileError = `Total file size too large (${totalSize} bytes, max ${MAX_TOTAL_SIZE})`;
-        }
+    const subRequests = req?.batch;
+    if (Array.isArray(subRequests)) {
+      const batch: string[] = [];
+      for (const sub of subRequests) {
+        batch.push(await handleRequest(pyodide, runSnippet, sub ?? {}));
       }
-    }
-
-    if (fileError) {
-      const resp: Response = {
-        ok: false,
-        stdout: "",
-        stderr: "",
-        result: null,
-        error: fileError,
-      };
-      console.log(JSON.stringify(resp));
+      await writeFrame(`{"batch":[${batch.join(",")}]}`);
       continue;
     }
 
-    try {
-      // Load requested packages (if present in the Pyodide distribution).
-      if (packages.length > 0) {
-        await pyodide.loadPackage(packages);
-      }
-
-      // Write pre-validated files into /work (already encoded, no double-encoding)
-      for (const { absPath, data } of encodedFiles) {
-        ensureDir(pyodide, absPath);
-        pyodide.FS.writeFile(absPath, data);
-      }
-
-      // Always run in /work.
-      try {
-        pyodide.FS.chdir("/work");
-      } catch (_e) {
-        // ignore
-      }
-
-      const wrapper = buildPythonWrapper(code, pythonpath);
-      const raw = await pyodide.runPythonAsync(wrapper);
-      const payload = JSON.parse(raw.toString());
-
-      // payload already matches Response shape
-      console.log(JSON.stringify(payload));
-    } catch (e) {
-      const resp: Response = {
-        ok: false,
-        stdout: "",
-        stderr: "",
-        result: null,
-        error: (e as Error).message ?? String(e),
-      };
-      console.log(JSON.stringify(resp));
-    }
+    await writeFrame(await handleRequest(pyodide, runSnippet, req));
   }
 }
 
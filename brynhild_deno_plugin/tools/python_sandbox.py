@@ -12,6 +12,8 @@ Security model (defense-in-depth):
   - read access limited to plugin root (vendored Pyodide files)
   - optional memory limit via V8 flags
 - Tool-side timeout kills the Deno process to recover from infinite loops.
+- Kernel rlimits back this up on POSIX hosts: RLIMIT_DATA caps writable memory and a
+  generous RLIMIT_CPU ceiling stops a runner that ignores the tool-side timeout.
 - All dependencies are vendored locally - no network access required.
 
 See README.md for setup instructions.
@@ -20,15 +22,34 @@ See README.md for setup instructions.
 from __future__ import annotations
 
 import asyncio as _asyncio
+import copy as _copy
+import dataclasses as _dataclasses
+import io as _io
 import json as _json
 import os as _os
 import pathlib as _pathlib
 import shutil as _shutil
+import signal as _signal
+import time as _time
 import typing as _typing
 
-# brynhild is a required dependency - import directly
+# brynhild is a required dependency - import directly. This cannot be deferred: Tool
+# subclasses _base.Tool at class-definition time. The plugin package __init__ never
+# imports this module, so plugin discovery stays cheap and this module is only loaded
+# when brynhild resolves the brynhild.tools entry point (brynhild is already imported).
 import brynhild.tools.base as _base
 
+try:
+    # Optional C-accelerated JSON codec (pip install brynhild-deno-plugin[fast]).
+    import orjson as _orjson
+except ImportError:
+    _orjson = None  # type: ignore[assignment]
+
+try:
+    import resource as _resource
+except ImportError:  # Windows
+    _resource = None  # type: ignore[assignment]
+
 
 def _env_bool(name: str, default: bool = False) -> bool:
     raw = _os.environ.get(name)
@@ -37,30 +58,417 @@ def _env_bool(name: str, default: bool = False) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
-def _clamp_int(value: int, *, lo: int, hi: int) -> int:
-    return max(lo, min(hi, value))
+@_dataclasses.dataclass(frozen=True)
+class _EnvConfig:
+    """BRYNHILD_PYODIDE_* settings, read once at import (see Tool.refresh_env)."""
+
+    deno_bin: str
+    timeout_ms: int
+    memory_mb: int
+    max_output_chars: int
+    max_payload_bytes: int
+    allow_net: bool
+    require_permission: bool
+    prewarm: bool
+    pool_size: int
+
+    @classmethod
+    def from_environ(cls) -> _EnvConfig:
+        env = _os.environ
+        return cls(
+            deno_bin=env.get("BRYNHILD_PYODIDE_DENO", "deno"),
+            timeout_ms=int(env.get("BRYNHILD_PYODIDE_TIMEOUT_MS", "30000")),
+            memory_mb=int(env.get("BRYNHILD_PYODIDE_MEMORY_MB", "512")),
+            max_output_chars=int(env.get("BRYNHILD_PYODIDE_MAX_OUTPUT_CHARS", "12000")),
+            # Matches the runner's own request size limit; oversized requests are rejected
+            # before being pushed through the pipe.
+            max_payload_bytes=int(env.get("BRYNHILD_PYODIDE_MAX_PAYLOAD_BYTES", "1000000")),
+            # Hard-disable network by default; enable only if you understand the implications.
+            allow_net=_env_bool("BRYNHILD_PYODIDE_ALLOW_NET", default=False),
+            require_permission=_env_bool("BRYNHILD_PYODIDE_REQUIRE_PERMISSION", default=False),
+            prewarm=_env_bool("BRYNHILD_PYODIDE_PREWARM", default=False),
+            pool_size=int(env.get("BRYNHILD_PYODIDE_POOL_SIZE", "1")),
+        )
+
+
+_ENV = _EnvConfig.from_environ()
+
+
+def _json_dumps_bytes(obj: _typing.Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes (orjson when available)."""
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return _json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: bytes | str) -> _typing.Any:
+    """Parse JSON from bytes or str (orjson when available).
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can catch
+    the stdlib exception regardless of which codec is active. orjson rejects
+    lone-surrogate escapes such as "\\ud800", which the runner's json.dumps emits
+    when user code prints one; that input is retried with the stdlib decoder.
+    """
+    if _orjson is not None:
+        try:
+            return _orjson.loads(data)
+        except _orjson.JSONDecodeError:
+            pass
+    return _json.loads(data)
+
+
+def _host_memory_mb() -> int | None:
+    """Return the memory budget (MB) for this process, or None if unknown.
+
+    Uses the cgroup limit (v2, then v1) when one is set, otherwise physical RAM.
+    """
+    limits: list[int] = []
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            raw = _pathlib.Path(path).read_text().strip()
+        except OSError:
+            continue
+        if raw.isdigit():
+            limits.append(int(raw) // (1024 * 1024))
+        break  # "max" (v2) or the first readable controller decides
+    try:
+        limits.append(_os.sysconf("SC_PHYS_PAGES") * _os.sysconf("SC_PAGE_SIZE") // (1024 * 1024))
+    except (AttributeError, ValueError, OSError):
+        pass
+    # cgroup v1 reports a huge sentinel when unlimited; min() with RAM handles it.
+    return min(limits) if limits else None
+
+
+# Kernel-enforced ceilings for the Deno child (POSIX only).
+#
+# RLIMIT_DATA rather than RLIMIT_AS: V8 reserves many GB of PROT_NONE address space for
+# WebAssembly guard regions and the pointer-compression cage, so an address-space cap
+# would stop Pyodide from loading at all. RLIMIT_DATA only counts writable mappings.
+# The base covers what lives outside the V8 heap (Pyodide's wasm memory, stdlib, Deno).
+_RLIMIT_DATA_BASE_MB = 1024
+# RLIMIT_CPU is a backstop for a runner that stops responding to the tool-side timeout,
+# which should always fire first. It counts CPU time across all of the runner's threads
+# (V8 GC and compiler threads, and Pyodide's multi-threaded wasm compilation at
+# startup), so the ceiling sits well above what a request can use within its timeout:
+# a multiple of the timeout plus an allowance that also absorbs process startup.
+_CPU_LIMIT_TIMEOUT_MULTIPLE = 4
+_CPU_LIMIT_STARTUP_S = 60
+_CPU_COUNT = _os.cpu_count() or 1
+
+
+def _data_limit_preexec(limit_bytes: int) -> _typing.Callable[[], None]:
+    def _preexec() -> None:
+        # Runs in the forked child before exec: keep it to the single syscall.
+        _resource.setrlimit(_resource.RLIMIT_DATA, (limit_bytes, limit_bytes))
+
+    return _preexec
+
+
+def _proc_cpu_seconds(pid: int) -> float | None:
+    """Return user+system CPU seconds consumed by pid, or None if unavailable."""
+    try:
+        stat = _pathlib.Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name; utime/stime are fields 14/15.
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return (int(fields[11]) + int(fields[12])) / _os.sysconf("SC_CLK_TCK")
+
+
+def _arm_cpu_limit(pid: int, timeout_ms: int) -> None:
+    """Set pid's soft RLIMIT_CPU to its current usage plus a backstop budget.
+
+    The budget is _CPU_LIMIT_TIMEOUT_MULTIPLE times the timeout plus
+    _CPU_LIMIT_STARTUP_S, in CPU-seconds summed over all of the runner's threads.
+    Only the soft limit moves (SIGXCPU), since an unprivileged parent cannot raise a
+    hard limit again. Linux only; no-op elsewhere.
+    """
+    if _resource is None or not hasattr(_resource, "prlimit"):
+        return
+    used = _proc_cpu_seconds(pid)
+    if used is None:
+        return
+    ceiling = int(used + _CPU_LIMIT_TIMEOUT_MULTIPLE * timeout_ms / 1000.0) + _CPU_LIMIT_STARTUP_S
+    try:
+        _, hard = _resource.prlimit(pid, _resource.RLIMIT_CPU)
+        if hard != _resource.RLIM_INFINITY:
+            ceiling = min(ceiling, hard)
+        _resource.prlimit(pid, _resource.RLIMIT_CPU, (ceiling, hard))
+    except (OSError, ValueError):
+        pass  # Process gone or limits not permitted; the tool-side timeout still applies.
+
+
+# Runner protocol: every message (both directions) is a 4-byte little-endian length
+# followed by that many bytes of UTF-8 JSON. See deno/runner.ts.
+_FRAME_HEADER_BYTES = 4
+_SHUTDOWN_REQUEST = b'{"shutdown":true}'
+
+
+# SIGKILL doesn't exist on Windows, where SIGTERM maps to TerminateProcess anyway.
+_SIGKILL = getattr(_signal, "SIGKILL", _signal.SIGTERM)
+
+
+def _signal_group(proc: _asyncio.subprocess.Process, sig: int) -> None:
+    """Send sig to the runner's whole process group (it leads its own session).
+
+    Falls back to signalling just the process where process groups don't exist.
+    """
+    try:
+        if hasattr(_os, "killpg"):
+            _os.killpg(proc.pid, sig)
+        else:
+            proc.send_signal(sig)
+    except ProcessLookupError:
+        pass  # Already gone
+
+
+def _frame_header(length: int) -> bytes:
+    return length.to_bytes(_FRAME_HEADER_BYTES, "little")
+
+
+async def _read_frame(reader: _asyncio.StreamReader) -> bytes:
+    """Read one length-prefixed frame body.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream hits EOF mid-frame (runner died).
+    """
+    header = await reader.readexactly(_FRAME_HEADER_BYTES)
+    return await reader.readexactly(int.from_bytes(header, "little"))
+
+
+# File injection limits, mirroring runner.ts (P1-2.5). Checked here too so a rejected
+# request is never serialized and piped to the runner.
+_MAX_FILES = 100
+_MAX_FILE_BYTES = 1_000_000
+_MAX_TOTAL_FILE_BYTES = 10_000_000
+
+
+def _check_file_limits(files: dict[str, str | bytes | bytearray]) -> str | None:
+    """Return the runner's error message for files that exceed its limits, else None."""
+    if len(files) > _MAX_FILES:
+        return f"Too many files ({len(files)}, max {_MAX_FILES})"
+    total = 0
+    for path, content in files.items():
+        if isinstance(content, (bytes, bytearray)):
+            size = len(content)
+        else:
+            # surrogatepass: a lone surrogate must not crash the size check; the request
+            # encode rejects it afterwards as an invalid payload.
+            size = len(content) if content.isascii() else len(content.encode("utf-8", "surrogatepass"))
+        if size > _MAX_FILE_BYTES:
+            return f"File '{path}' too large ({size} bytes, max {_MAX_FILE_BYTES})"
+        total += size
+    if total > _MAX_TOTAL_FILE_BYTES:
+        return f"Total file size too large ({total} bytes, max {_MAX_TOTAL_FILE_BYTES})"
+    return None
+
+
+def _decode_files(files: dict[str, _typing.Any]) -> dict[str, _typing.Any] | str:
+    """Decode bytes file contents as UTF-8 for the JSON request; returns an error message on failure."""
+    if not any(isinstance(content, (bytes, bytearray)) for content in files.values()):
+        return files
+    decoded = {}
+    for path, content in files.items():
+        if isinstance(content, (bytes, bytearray)):
+            try:
+                content = content.decode("utf-8")
+            except UnicodeDecodeError as e:
+                return f"File '{path}' is not valid UTF-8: {e}"
+        decoded[path] = content
+    return decoded
+
+
+def _clamp_int(value: int, lo: int, hi: int, /) -> int:
+    return lo if value < lo else hi if value > hi else value
+
+
+# Static tool metadata, built once at import. The schema is a plain nested dict so
+# providers can JSON-serialize it as-is; input_schema hands out deep copies, so a caller
+# that edits its copy (e.g. stripping defaults for strict schemas) can't corrupt it.
+_DESCRIPTION = (
+    "Executes Python code in a sandbox using Deno + Pyodide (WebAssembly). "
+    "Returns captured stdout/stderr and the value of the final expression."
+)
+
+_INPUT_SCHEMA: dict[str, _typing.Any] = {
+    "type": "object",
+    "properties": {
+        "code": {
+            "type": "string",
+            "description": "Python code to execute. The value of the final expression (if any) is returned.",
+        },
+        "files": {
+            "type": "object",
+            "description": (
+                "Optional mapping of file paths to contents. Files are written into the sandbox "
+                "under /work/<path> (path traversal is rejected)."
+            ),
+            "additionalProperties": {"type": "string"},
+        },
+        "packages": {
+            "type": "array",
+            "description": (
+                "Optional Pyodide packages to load via pyodide.loadPackage(). "
+                "Only packages included in the vendored Pyodide distribution are available."
+            ),
+            "items": {"type": "string"},
+            "default": [],
+        },
+        "pythonpath": {
+            "type": "array",
+            "description": "Extra in-sandbox paths to prepend to sys.path (e.g. ['/work']).",
+            "items": {"type": "string"},
+            "default": [],
+        },
+        "timeout_ms": {
+            "type": "integer",
+            "description": "Execution timeout in milliseconds. On timeout, the sandbox process is killed.",
+            "default": 30000,
+            "minimum": 1,
+            "maximum": 600000,
+        },
+        "memory_mb": {
+            "type": "integer",
+            "description": (
+                "V8 heap limit (MB) for the Deno process. Helps limit memory usage. "
+                "This is a best-effort guard, not a strict RSS cap."
+            ),
+            "default": 512,
+            "minimum": 16,
+            "maximum": 4096,
+        },
+        "reset": {
+            "type": "boolean",
+            "description": "If true, restarts the sandbox process before executing (clears all state).",
+            "default": False,
+        },
+        "format": {
+            "type": "string",
+            "enum": ["text", "json"],
+            "description": (
+                "Output format. 'text' returns a readable block. "
+                "'json' returns a JSON object string."
+            ),
+            "default": "text",
+        },
+    },
+    "required": ["code"],
+}
+
+
+@_dataclasses.dataclass(frozen=True, slots=True)
+class _CallSpec:
+    """One validated call: the runner payload plus the tool-side settings for it."""
+
+    payload: dict[str, _typing.Any]
+    timeout_ms: int
+    memory_mb: int
+    reset: bool
+    fmt: str
+
+
+class _Worker:
+    """One pool slot: a lazily spawned runner process and the settings it was spawned with."""
+
+    __slots__ = ("proc", "memory_mb", "cpu_limit", "stale")
+
+    def __init__(self) -> None:
+        self.proc: _asyncio.subprocess.Process | None = None
+        self.memory_mb: int | None = None
+        # (pid, timeout_ms, monotonic time) of the last RLIMIT_CPU arm.
+        self.cpu_limit: tuple[int, int, float] | None = None
+        # Set when a reset ran while this worker was busy: its process still holds the
+        # old state and is replaced on the worker's next use.
+        self.stale = False
+
+    def ensure_cpu_limit(self, timeout_ms: int) -> None:
+        """Arm the RLIMIT_CPU backstop unless the current ceiling still covers this request.
+
+        RLIMIT_CPU is cumulative, so the ceiling is re-armed for a new process, for a
+        longer timeout than it was armed with, or once the runner could have used up the
+        startup allowance: it burns at most _CPU_COUNT CPU-seconds per wall second, so
+        until then at least the full timeout budget is left. Back-to-back requests skip
+        the /proc read and prlimit calls.
+        """
+        assert self.proc is not None
+        pid = self.proc.pid
+        now = _time.monotonic()
+        if self.cpu_limit is not None:
+            armed_pid, armed_timeout_ms, armed_at = self.cpu_limit
+            if (
+                armed_pid == pid
+                and timeout_ms <= armed_timeout_ms
+                and (now - armed_at) * _CPU_COUNT <= _CPU_LIMIT_STARTUP_S
+            ):
+                return
+        _arm_cpu_limit(pid, timeout_ms)
+        self.cpu_limit = (pid, timeout_ms, now)
 
 
 class Tool(_base.Tool):
-    """Sandboxed Python execution using Deno + Pyodide."""
+    """Sandboxed Python execution using Deno + Pyodide.
+
+    Requests are served by a small pool of persistent runner processes
+    (BRYNHILD_PYODIDE_POOL_SIZE, default 1). Idle workers are reused most-recently-used
+    first, so sequential calls always land on the same interpreter and see each other's
+    state; only calls that overlap in time fan out to other workers, whose state is
+    separate. reset=True clears every worker: idle ones right away, ones busy with an
+    overlapping call before they serve their next one.
+    """
 
     def __init__(self) -> None:
-        self._lock = _asyncio.Lock()
-        self._proc: _asyncio.subprocess.Process | None = None
-        self._proc_memory_mb: int | None = None
+        # Serializes process spawns only. A worker is exclusively owned by whoever took it
+        # from self._idle, so request I/O needs no lock of its own.
+        self._spawn_lock = _asyncio.Lock()
 
         self._plugin_root = _pathlib.Path(__file__).resolve().parent.parent
         self._runner_path = self._plugin_root / "deno" / "runner.ts"
         self._vendor_pyodide = self._plugin_root / "vendor" / "pyodide"
 
-        self._deno_bin = _os.environ.get("BRYNHILD_PYODIDE_DENO", "deno")
-
-        self._default_timeout_ms = int(_os.environ.get("BRYNHILD_PYODIDE_TIMEOUT_MS", "30000"))
-        self._default_memory_mb = int(_os.environ.get("BRYNHILD_PYODIDE_MEMORY_MB", "512"))
-        self._max_output_chars = int(_os.environ.get("BRYNHILD_PYODIDE_MAX_OUTPUT_CHARS", "12000"))
-
-        # Hard-disable network by default; enable only if you understand the implications.
-        self._allow_net = _env_bool("BRYNHILD_PYODIDE_ALLOW_NET", default=False)
+        env = _ENV
+        self._deno_bin = env.deno_bin
+        self._deno_path: str | None = None  # resolved by _check_runtime()
+        self._host_memory_mb: int | None = None  # resolved by _check_runtime()
+        # Environment for the Deno child, snapshotted once rather than copied per spawn.
+        self._child_env = dict(_os.environ)
+
+        self._default_timeout_ms = env.timeout_ms
+        self._default_memory_mb = env.memory_mb
+        self._max_output_chars = env.max_output_chars
+        # The runner truncates output at source to a little under our own cap, so its
+        # "truncated at source" marker survives the tool-side _truncate safety net
+        # (12000 -> 10000).
+        self._source_output_chars = max(1, env.max_output_chars // 2, env.max_output_chars - 2000)
+        self._max_payload_bytes = env.max_payload_bytes
+        self._allow_net = env.allow_net
+
+        # Pool slots are created up front; each spawns its process on first use.
+        self._pool_size = _clamp_int(env.pool_size, 1, _os.cpu_count() or 1)
+        self._workers = [_Worker() for _ in range(self._pool_size)]
+        self._idle: _asyncio.LifoQueue[_Worker] = _asyncio.LifoQueue()
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+
+        # Opt-in: start the sandbox process in the background as soon as the tool is
+        # created inside a running event loop, so the first call skips Deno/Pyodide startup.
+        self._prewarm_task: _asyncio.Task[None] | None = None
+        if env.prewarm:
+            try:
+                loop = _asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None  # Constructed outside a loop; call prewarm() explicitly instead.
+            if loop is not None:
+                self._prewarm_task = loop.create_task(self.prewarm())
+
+    @classmethod
+    def refresh_env(cls) -> None:
+        """Re-read BRYNHILD_PYODIDE_* environment variables.
+
+        Settings are otherwise resolved once at import. requires_permission picks up the
+        new values immediately; other settings apply to Tool instances created afterwards.
+        """
+        global _ENV
+        _ENV = _EnvConfig.from_environ()
 
     @property
     def name(self) -> str:
@@ -68,77 +476,11 @@ class Tool(_base.Tool):
 
     @property
     def description(self) -> str:
-        return (
-            "Executes Python code in a sandbox using Deno + Pyodide (WebAssembly). "
-            "Returns captured stdout/stderr and the value of the final expression."
-        )
+        return _DESCRIPTION
 
     @property
     def input_schema(self) -> dict[str, _typing.Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "code": {
-                    "type": "string",
-                    "description": "Python code to execute. The value of the final expression (if any) is returned.",
-                },
-                "files": {
-                    "type": "object",
-                    "description": (
-                        "Optional mapping of file paths to contents. Files are written into the sandbox "
-                        "under /work/<path> (path traversal is rejected)."
-                    ),
-                    "additionalProperties": {"type": "string"},
-                },
-                "packages": {
-                    "type": "array",
-                    "description": (
-                        "Optional Pyodide packages to load via pyodide.loadPackage(). "
-                        "Only packages included in the vendored Pyodide distribution are available."
-                    ),
-                    "items": {"type": "string"},
-                    "default": [],
-                },
-                "pythonpath": {
-                    "type": "array",
-                    "description": "Extra in-sandbox paths to prepend to sys.path (e.g. ['/work']).",
-                    "items": {"type": "string"},
-                    "default": [],
-                },
-                "timeout_ms": {
-                    "type": "integer",
-                    "description": "Execution timeout in milliseconds. On timeout, the sandbox process is killed.",
-                    "default": 30000,
-                    "minimum": 1,
-                    "maximum": 600000,
-                },
-                "memory_mb": {
-                    "type": "integer",
-                    "description": (
-                        "V8 heap limit (MB) for the Deno process. Helps limit memory usage. "
-                        "This is a best-effort guard, not a strict RSS cap."
-                    ),
-                    "default": 512,
-                    "minimum": 16,
-                    "maximum": 4096,
-                },
-                "reset": {
-                    "type": "boolean",
-                    "description": "If true, restarts the sandbox process before executing (clears all state).",
-                    "default": False,
-                },
-                "format": {
-                    "type": "string",
-                    "enum": ["text", "json"],
-                    "description": (
-                        "Output format. 'text' returns a readable block. "
-                        "'json' returns a JSON object string."
-                    ),
-                    "default": "text",
-                },
-            },
-            "required": ["code"],
-        }
+        return _copy.deepcopy(_INPUT_SCHEMA)
 
     @property
     def requires_permission(self) -> bool:
@@ -147,7 +489,7 @@ class Tool(_base.Tool):
         #
         # Sandbox is safe by design (WebAssembly isolation), so no permission needed.
         # Set BRYNHILD_PYODIDE_REQUIRE_PERMISSION=true to enable prompts if desired.
-        return _env_bool("BRYNHILD_PYODIDE_REQUIRE_PERMISSION", default=False)
+        return _ENV.require_permission
 
     # Optional (new in Brynhild 0.2.0): classify risk and recovery behavior
     @property
@@ -159,6 +501,70 @@ class Tool(_base.Tool):
         return "allow"
 
     async def execute(self, input: dict[str, _typing.Any]) -> _base.ToolResult:
+        spec = self._parse_input(input)
+        if isinstance(spec, _base.ToolResult):
+            return spec
+
+        blob = self._encode_request(spec.payload)
+        if isinstance(blob, _base.ToolResult):
+            return blob
+
+        resp = await self._round_trip(blob, timeout_ms=spec.timeout_ms, memory_mb=spec.memory_mb, reset=spec.reset)
+        if isinstance(resp, _base.ToolResult):
+            return resp
+        return self._format_response(resp, spec.fmt)
+
+    async def execute_batch(self, inputs: list[dict[str, _typing.Any]]) -> list[_base.ToolResult]:
+        """Run several calls in one runner round-trip, in order, on the same interpreter.
+
+        Each input takes the same keys as execute() and gets its own ToolResult; an item
+        that fails validation or raises doesn't stop the others. The batch shares one
+        process, so memory_mb is the largest requested and the timeout is the sum of the
+        items' timeouts. reset is only honored on the first item (it restarts the process
+        before the batch runs).
+        """
+        results: list[_base.ToolResult | None] = [None] * len(inputs)
+        specs: list[tuple[int, _CallSpec]] = []
+        for i, item in enumerate(inputs):
+            spec = self._parse_input(item)
+            if isinstance(spec, _base.ToolResult):
+                results[i] = spec
+            elif spec.reset and specs:
+                results[i] = _base.ToolResult(
+                    success=False, output="", error="reset is only supported on the first call of a batch"
+                )
+            else:
+                specs.append((i, spec))
+
+        if specs:
+            batch_results = await self._run_batch([spec for _, spec in specs])
+            for (i, _spec), result in zip(specs, batch_results):
+                results[i] = result
+
+        return _typing.cast(list[_base.ToolResult], results)
+
+    async def _run_batch(self, specs: list[_CallSpec]) -> list[_base.ToolResult]:
+        blob = self._encode_request({"batch": [spec.payload for spec in specs]})
+        if isinstance(blob, _base.ToolResult):
+            return [blob] * len(specs)
+
+        resp = await self._round_trip(
+            blob,
+            timeout_ms=sum(spec.timeout_ms for spec in specs),
+            memory_mb=max(spec.memory_mb for spec in specs),
+            reset=specs[0].reset,
+        )
+        if isinstance(resp, _base.ToolResult):
+            return [resp] * len(specs)
+
+        responses = resp.get("batch")
+        if not isinstance(responses, list) or len(responses) != len(specs):
+            error = _base.ToolResult(success=False, output="", error="Runner returned a malformed batch response")
+            return [error] * len(specs)
+        return [self._format_response(item, spec.fmt) for spec, item in zip(specs, responses)]
+
+    def _parse_input(self, input: dict[str, _typing.Any]) -> _CallSpec | _base.ToolResult:
+        """Validate one call's input; returns the error ToolResult if it's invalid."""
         code = input.get("code")
         if not isinstance(code, str) or not code.strip():
             return _base.ToolResult(success=False, output="", error="code is required and must be a non-empty string")
@@ -166,12 +572,12 @@ class Tool(_base.Tool):
         timeout_ms = input.get("timeout_ms", self._default_timeout_ms)
         if not isinstance(timeout_ms, int):
             return _base.ToolResult(success=False, output="", error="timeout_ms must be an integer")
-        timeout_ms = _clamp_int(timeout_ms, lo=1, hi=600_000)
+        timeout_ms = _clamp_int(timeout_ms, 1, 600_000)
 
         memory_mb = input.get("memory_mb", self._default_memory_mb)
         if not isinstance(memory_mb, int):
             return _base.ToolResult(success=False, output="", error="memory_mb must be an integer")
-        memory_mb = _clamp_int(memory_mb, lo=16, hi=4096)
+        memory_mb = _clamp_int(memory_mb, 16, 4096)
 
         reset = bool(input.get("reset", False))
         fmt = input.get("format", "text")
@@ -183,8 +589,16 @@ class Tool(_base.Tool):
             return _base.ToolResult(success=False, output="", error="files must be an object (mapping path -> content)")
         # Ensure all file values are strings (runner will coerce, but be strict here).
         for k, v in files.items():
-            if not isinstance(k, str) or not isinstance(v, str):
+            if not isinstance(k, str) or not isinstance(v, (str, bytes, bytearray)):
                 return _base.ToolResult(success=False, output="", error="files must map string paths to string contents")
+        file_error = _check_file_limits(files)
+        if file_error is not None:
+            return _base.ToolResult(success=False, output="", error=file_error)
+        # Python callers may pass bytes contents; they are size-checked above by len()
+        # and only decoded once they are known to fit.
+        files = _decode_files(files)
+        if isinstance(files, str):
+            return _base.ToolResult(success=False, output="", error=files)
 
         packages = input.get("packages") or []
         if not isinstance(packages, list) or any(not isinstance(p, str) for p in packages):
@@ -199,11 +613,39 @@ class Tool(_base.Tool):
             "files": files,
             "packages": packages,
             "pythonpath": pythonpath,
+            "max_output_chars": self._source_output_chars,
         }
+        return _CallSpec(payload=payload, timeout_ms=timeout_ms, memory_mb=memory_mb, reset=reset, fmt=fmt)
 
+    def _encode_request(self, request: dict[str, _typing.Any]) -> bytes | _base.ToolResult:
+        # Serialize once up front (elements were type-checked in _parse_input): this is
+        # the exact blob we send, so its length is the request size for the cap below.
+        try:
+            blob = _json_dumps_bytes(request)
+        except (TypeError, ValueError) as e:
+            # orjson raises a TypeError subclass for unserializable values and lone
+            # surrogates; the stdlib fallback raises UnicodeEncodeError for the latter.
+            return _base.ToolResult(success=False, output="", error=f"invalid payload: {e}")
+        if len(blob) > self._max_payload_bytes:
+            return _base.ToolResult(
+                success=False,
+                output="",
+                error=f"Request too large ({len(blob)} bytes, max {self._max_payload_bytes})",
+            )
+        return blob
+
+    async def _round_trip(
+        self,
+        blob: bytes,
+        *,
+        timeout_ms: int,
+        memory_mb: int,
+        reset: bool,
+    ) -> dict[str, _typing.Any] | _base.ToolResult:
+        """Send one request to the runner; failures come back as an error ToolResult."""
         try:
-            resp = await self._call_runner(
-                payload,
+            return await self._call_runner(
+                blob,
                 timeout_ms=timeout_ms,
                 memory_mb=memory_mb,
                 reset=reset,
@@ -227,20 +669,26 @@ class Tool(_base.Tool):
                 error=str(e),
             )
 
+    def _format_response(self, resp: dict[str, _typing.Any], fmt: str) -> _base.ToolResult:
         # Truncate very large fields to keep tool outputs manageable.
         stdout = str(resp.get("stdout") or "")
         stderr = str(resp.get("stderr") or "")
         result = resp.get("result")
         error = resp.get("error")
 
-        stdout = self._truncate(stdout)
-        stderr = self._truncate(stderr)
-        if isinstance(result, str):
-            result = self._truncate(result)
+        cap = self._max_output_chars
+        if len(stdout) > cap:
+            stdout = self._truncate(stdout, cap)
+        if len(stderr) > cap:
+            stderr = self._truncate(stderr, cap)
+        if isinstance(result, str) and len(result) > cap:
+            result = self._truncate(result, cap)
 
         if fmt == "json":
             return _base.ToolResult(
                 success=bool(resp.get("ok")),
+                # stdlib json, not the wire codec: the output is a str for the user, and
+                # it has to carry lone surrogates from user output, which UTF-8 can't.
                 output=_json.dumps(
                     {
                         "ok": bool(resp.get("ok")),
@@ -254,18 +702,25 @@ class Tool(_base.Tool):
                 error=(None if resp.get("ok") else (error or "Python execution failed")),
             )
 
-        # Human-readable format
-        blocks: list[str] = []
+        # Human-readable format: labeled sections separated by blank lines, written
+        # straight into one buffer instead of concatenating per-section copies.
+        buf = _io.StringIO()
+        write = buf.write
         if stdout:
-            blocks.append("stdout:\n" + stdout.rstrip())
+            write("stdout:\n")
+            write(stdout.rstrip())
         if stderr:
-            blocks.append("stderr:\n" + stderr.rstrip())
+            if buf.tell():
+                write("\n\n")
+            write("stderr:\n")
+            write(stderr.rstrip())
         if result is not None:
-            blocks.append("result:\n" + str(result).rstrip())
-        if not blocks:
-            blocks.append("(no output)")
+            if buf.tell():
+                write("\n\n")
+            write("result:\n")
+            write(str(result).rstrip())
 
-        combined = "\n\n".join(blocks).rstrip() + "\n"
+        combined = buf.getvalue().rstrip() + "\n" if buf.tell() else "(no output)\n"
 
         return _base.ToolResult(
             success=bool(resp.get("ok")),
@@ -273,20 +728,43 @@ class Tool(_base.Tool):
             error=(None if resp.get("ok") else (error or "Python execution failed")),
         )
 
-    def _truncate(self, s: str) -> str:
-        if len(s) <= self._max_output_chars:
-            return s
-        head = s[: self._max_output_chars]
-        return head + f"\n… [truncated to {self._max_output_chars} chars]"
+    @staticmethod
+    def _truncate(s: str, cap: int) -> str:
+        """Cut s to cap chars plus a marker. Callers only call this when len(s) > cap."""
+        return f"{s[:cap]}\n… [truncated to {cap} chars]"
+
+    async def prewarm(self) -> None:
+        """Spawn a sandbox process ahead of the first call.
+
+        Uses the default memory limit; a later call with a different memory_mb still
+        respawns. Setup errors are left for execute() to report.
+        """
+        try:
+            self._check_runtime()
+        except FileNotFoundError:
+            return
+        worker = await self._idle.get()
+        try:
+            if worker.proc is not None:
+                return
+            try:
+                await self._respawn_locked(worker, memory_mb=self._default_memory_mb)
+            except OSError:
+                return
+        finally:
+            self._idle.put_nowait(worker)
+
+    def _check_runtime(self) -> str:
+        """Return the resolved deno executable path.
+
+        Raises FileNotFoundError if the runner, Pyodide, or deno is missing. A successful
+        check is cached, so the stat()/PATH lookups run once rather than on every call.
+        The host memory budget the first spawn sizes its heap against is read here too,
+        keeping construction free of filesystem work.
+        """
+        if self._deno_path is not None:
+            return self._deno_path
 
-    async def _call_runner(
-        self,
-        payload: dict[str, _typing.Any],
-        *,
-        timeout_ms: int,
-        memory_mb: int,
-        reset: bool,
-    ) -> dict[str, _typing.Any]:
         if not self._runner_path.exists():
             raise FileNotFoundError(f"Runner script not found: {self._runner_path}")
 
@@ -296,51 +774,123 @@ class Tool(_base.Tool):
                 "Run scripts/vendor-pyodide.sh to download."
             )
 
-        if _shutil.which(self._deno_bin) is None:
+        deno_path = _shutil.which(self._deno_bin)
+        if deno_path is None:
             raise FileNotFoundError(
                 f"deno executable not found ({self._deno_bin}). Install Deno and/or set BRYNHILD_PYODIDE_DENO."
             )
+        self._host_memory_mb = _host_memory_mb()
+        self._deno_path = deno_path
+        return deno_path
 
-        async with self._lock:
-            if reset:
-                await self._kill_proc_locked()
-
-            if self._proc is None or self._proc.returncode is not None or self._proc_memory_mb != memory_mb:
-                await self._kill_proc_locked()
-                self._proc = await self._spawn_proc_locked(memory_mb=memory_mb)
-                self._proc_memory_mb = memory_mb
-
-            assert self._proc is not None
-            proc = self._proc
+    async def _call_runner(
+        self,
+        blob: bytes,
+        *,
+        timeout_ms: int,
+        memory_mb: int,
+        reset: bool,
+    ) -> dict[str, _typing.Any]:
+        self._check_runtime()
 
-            # Send request line
-            line = _json.dumps(payload, ensure_ascii=False) + "\n"
-            assert proc.stdin is not None
-            proc.stdin.write(line.encode("utf-8"))
-            await proc.stdin.drain()
+        worker = await self._idle.get()
+        try:
+            return await self._call_worker(worker, blob, timeout_ms=timeout_ms, memory_mb=memory_mb, reset=reset)
+        finally:
+            self._idle.put_nowait(worker)
 
-            # Read one response line with timeout
-            assert proc.stdout is not None
-            try:
-                raw = await _asyncio.wait_for(proc.stdout.readline(), timeout=timeout_ms / 1000.0)
-            except _asyncio.TimeoutError:
-                # P0-A: Force-kill on timeout to prevent wedged subprocess
-                await self._force_kill_proc_locked()
-                raise
-
-            if not raw:
-                # Process died unexpectedly; read stderr for details (bounded, with timeout).
-                err = await self._read_stderr_bounded(proc)
-                await self._kill_proc_locked()
-                raise RuntimeError(f"Deno runner exited unexpectedly. stderr:\n{err.strip()}")
-
-            text = raw.decode("utf-8", errors="replace").strip()
-            try:
-                return _json.loads(text)
-            except _json.JSONDecodeError:
-                # Try to read additional stderr context (bounded, with timeout)
-                err = await self._read_stderr_bounded(proc)
-                raise RuntimeError(f"Runner returned non-JSON output: {text[:200]}\n\nstderr:\n{err[:500]}")
+    async def _call_worker(
+        self,
+        worker: _Worker,
+        blob: bytes,
+        *,
+        timeout_ms: int,
+        memory_mb: int,
+        reset: bool,
+    ) -> dict[str, _typing.Any]:
+        if reset:
+            # Clear state everywhere a later call could land: this worker and the idle
+            # ones now, workers busy with other calls as soon as they are next used.
+            await self._reset_other_workers(worker)
+            await self._kill_proc_locked(worker)
+            worker.stale = False
+        elif worker.stale:
+            worker.stale = False
+            await self._kill_proc_locked(worker)
+
+        # worker.proc is only ever cleared by the kill paths, so "not None" means "we
+        # believe it's alive" without polling the transport for a returncode on every
+        # call. A runner that died while idle is caught by the write below instead.
+        if worker.proc is None or worker.memory_mb != memory_mb:
+            await self._respawn_locked(worker, memory_mb=memory_mb)
+
+        assert worker.proc is not None
+        proc = worker.proc
+
+        worker.ensure_cpu_limit(timeout_ms)
+
+        # Send one length-prefixed request frame. The blob is already UTF-8 bytes;
+        # queue header and body as separate buffers rather than concatenating a copy.
+        try:
+            await self._send_frame(proc, blob)
+        except ConnectionError:
+            # The runner exited since its last request; retry once on a fresh one.
+            await self._respawn_locked(worker, memory_mb=memory_mb)
+            assert worker.proc is not None
+            proc = worker.proc
+            worker.ensure_cpu_limit(timeout_ms)
+            await self._send_frame(proc, blob)
+
+        # Read one response frame with timeout
+        assert proc.stdout is not None
+        try:
+            async with _asyncio.timeout(timeout_ms / 1000.0):
+                raw = await _read_frame(proc.stdout)
+        except _asyncio.TimeoutError:
+            # P0-A: Force-kill on timeout to prevent wedged subprocess
+            await self._force_kill_proc_locked(worker)
+            raise
+        except _asyncio.IncompleteReadError:
+            # Process died unexpectedly; read stderr for details (bounded, with timeout).
+            err = await self._read_stderr_bounded(proc)
+            await self._kill_proc_locked(worker)
+            raise RuntimeError(f"Deno runner exited unexpectedly. stderr:\n{err.strip()}")
+
+        # Parse the frame bytes directly; only decode to text for the error message.
+        try:
+            return _json_loads(raw)
+        except _json.JSONDecodeError:
+            # Try to read additional stderr context (bounded, with timeout)
+            err = await self._read_stderr_bounded(proc)
+            text = raw[:200].decode("utf-8", errors="replace")
+            raise RuntimeError(f"Runner returned non-JSON output: {text}\n\nstderr:\n{err[:500]}")
+
+    @staticmethod
+    async def _send_frame(proc: _asyncio.subprocess.Process, blob: bytes) -> None:
+        assert proc.stdin is not None
+        proc.stdin.writelines((_frame_header(len(blob)), blob))
+        await proc.stdin.drain()
+
+    async def _respawn_locked(self, worker: _Worker, *, memory_mb: int) -> None:
+        await self._kill_proc_locked(worker)
+        async with self._spawn_lock:
+            worker.proc = await self._spawn_proc_locked(memory_mb=memory_mb)
+        worker.memory_mb = memory_mb
+
+    async def _reset_other_workers(self, current: _Worker) -> None:
+        """Kill every idle worker and mark busy ones stale; each respawns fresh on next use."""
+        idle: list[_Worker] = []
+        while not self._idle.empty():
+            idle.append(self._idle.get_nowait())
+        for w in self._workers:
+            if w is not current and w not in idle:
+                w.stale = True
+        try:
+            await _asyncio.gather(*(self._kill_proc_locked(w) for w in idle))
+        finally:
+            # Restore in the original most-recently-used order.
+            for w in reversed(idle):
+                self._idle.put_nowait(w)
 
     async def _spawn_proc_locked(self, *, memory_mb: int) -> _asyncio.subprocess.Process:
         # P1-2.3: Narrow --allow-read to minimum required paths
@@ -348,8 +898,9 @@ class Tool(_base.Tool):
         runner_path = str(self._runner_path.resolve())
         vendor_path = str(self._vendor_pyodide.resolve())
 
+        assert self._deno_path is not None
         args = [
-            self._deno_bin,
+            self._deno_path,
             "run",
             "--quiet",
             "--no-prompt",
@@ -365,21 +916,35 @@ class Tool(_base.Tool):
             #   --allow-net=cdn.jsdelivr.net,files.pythonhosted.org,pypi.org
             args.append("--allow-net")
 
-        # Best-effort memory cap for the JS side (V8 heap).
-        args.append(f"--v8-flags=--max-old-space-size={memory_mb}")
+        # Best-effort memory cap for the JS side (V8 heap), never more than half the
+        # host/cgroup budget: an over-sized heap turns GC pressure into a fatal OOM abort.
+        heap_mb = memory_mb
+        if self._host_memory_mb is not None:
+            heap_mb = max(16, min(memory_mb, self._host_memory_mb // 2))
+        # Scale the young generation with the heap so allocation bursts don't thrash
+        # scavenges on large heaps (512 MB -> 16 MB, V8's 64-bit default).
+        semi_space_mb = _clamp_int(heap_mb // 32, 1, 64)
+        args.append(f"--v8-flags=--max-old-space-size={heap_mb},--max-semi-space-size={semi_space_mb}")
         args.append(str(self._runner_path))
+        # Script arguments: the runner enforces the same request size cap as the tool.
+        args.append(f"--max-request-bytes={self._max_payload_bytes}")
 
-        env = dict(_os.environ)
+        preexec_fn = None
+        if _resource is not None:
+            preexec_fn = _data_limit_preexec((heap_mb * 2 + _RLIMIT_DATA_BASE_MB) * 1024 * 1024)
 
         # Important: do NOT grant Deno env access permission. We pass env from parent, but
         # inside Deno the script cannot read it without --allow-env.
         proc = await _asyncio.create_subprocess_exec(
             *args,
             cwd=str(self._plugin_root),
-            env=env,
+            env=self._child_env,
             stdin=_asyncio.subprocess.PIPE,
             stdout=_asyncio.subprocess.PIPE,
             stderr=_asyncio.subprocess.PIPE,
+            preexec_fn=preexec_fn,
+            # Own process group, so kills reach any helper processes Deno starts.
+            start_new_session=True,
         )
         return proc
 
@@ -388,56 +953,57 @@ class Tool(_base.Tool):
         if proc.stderr is None:
             return ""
         try:
-            data = await _asyncio.wait_for(proc.stderr.read(max_bytes), timeout=0.5)
+            async with _asyncio.timeout(0.5):
+                data = await proc.stderr.read(max_bytes)
             return data.decode("utf-8", errors="replace")
         except _asyncio.TimeoutError:
             return "(stderr read timed out)"
         except Exception:
             return ""
 
-    async def _force_kill_proc_locked(self) -> None:
-        """Force-kill subprocess without risking hang (P0-A).
+    async def _force_kill_proc_locked(self, worker: _Worker) -> None:
+        """Force-kill a worker's subprocess without risking hang (P0-A).
         
         This is called on timeout - we must not wait for graceful shutdown
         because the process may be wedged (e.g., infinite loop).
         """
-        if self._proc is None:
+        if worker.proc is None:
             return
-        proc = self._proc
-        self._proc = None
-        self._proc_memory_mb = None
+        proc = worker.proc
+        worker.proc = None
+        worker.memory_mb = None
 
-        # Immediately kill - no graceful shutdown attempt
+        # Immediately kill the whole group - no graceful shutdown attempt
         try:
-            proc.kill()
-        except ProcessLookupError:
-            pass  # Already dead
+            _signal_group(proc, _SIGKILL)
         except Exception:
             pass
 
         # Brief wait for cleanup, then abandon
         try:
-            await _asyncio.wait_for(proc.wait(), timeout=1.0)
+            async with _asyncio.timeout(1.0):
+                await proc.wait()
         except _asyncio.TimeoutError:
             pass  # Orphaned but we've moved on
         except Exception:
             pass
 
-    async def _kill_proc_locked(self) -> None:
-        """Gracefully kill subprocess with timeout protection (P0-C)."""
-        if self._proc is None:
+    async def _kill_proc_locked(self, worker: _Worker) -> None:
+        """Gracefully kill a worker's subprocess with timeout protection (P0-C)."""
+        if worker.proc is None:
             return
-        proc = self._proc
-        self._proc = None
-        self._proc_memory_mb = None
+        proc = worker.proc
+        worker.proc = None
+        worker.memory_mb = None
 
         # Try graceful shutdown, but with timeout to prevent hang
         try:
             if proc.stdin is not None and not proc.stdin.is_closing():
                 try:
-                    proc.stdin.write(b'{"shutdown": true}\n')
+                    proc.stdin.writelines((_frame_header(len(_SHUTDOWN_REQUEST)), _SHUTDOWN_REQUEST))
                     # P0-C: Add timeout to drain() to prevent hang if process not reading
-                    await _asyncio.wait_for(proc.stdin.drain(), timeout=0.5)
+                    async with _asyncio.timeout(0.5):
+                        await proc.stdin.drain()
                 except _asyncio.TimeoutError:
                     pass  # Process not reading, proceed to kill
                 except Exception:
@@ -449,14 +1015,27 @@ class Tool(_base.Tool):
         except Exception:
             pass
 
+        # Give the runner a moment to exit on its own, then escalate SIGTERM -> SIGKILL
+        # across its process group.
         try:
-            if proc.returncode is None:
-                proc.kill()
+            async with _asyncio.timeout(0.2):
+                await proc.wait()
+            return
+        except Exception:
+            pass
+
+        try:
+            _signal_group(proc, _signal.SIGTERM)
+            async with _asyncio.timeout(0.5):
+                await proc.wait()
+            return
         except Exception:
             pass
 
         try:
-            await _asyncio.wait_for(proc.wait(), timeout=1.0)
+            _signal_group(proc, _SIGKILL)
+            async with _asyncio.timeout(1.0):
+                await proc.wait()
         except Exception:
             pass
 
@@ -44,14 +44,28 @@ if _sys.version_info < (3, 11):
         f"Run with: ./local.venv/bin/python scripts/commit-helper.py plan.yaml"
     )
 
+import dataclasses as _dataclasses
+import itertools as _itertools
+import os as _os
 import pathlib as _pathlib
 import re as _re
 import subprocess as _subprocess
-import tomllib as _tomllib
 import typing as _typing
 
+# click is needed at import time for the CLI decorators. yaml and tomllib are
+# imported where they're used, so invocations that fail early (e.g. a missing
+# plan file) don't pay for them.
 import click as _click
-import yaml as _yaml
+
+
+# Max paths per git invocation, to stay well under the OS argument-length limit.
+_ARGV_BATCH = 1000
+
+
+def _batched(items: list[str], size: int = _ARGV_BATCH) -> _typing.Iterator[list[str]]:
+    """Yield successive slices of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 def _run_git(
@@ -59,7 +73,9 @@ def _run_git(
     cwd: _pathlib.Path,
     dry_run: bool = False,
     check: bool = True,
-) -> _subprocess.CompletedProcess[str]:
+    capture: bool = False,
+    text: bool = False,
+) -> _subprocess.CompletedProcess[_typing.Any]:
     """Run a git command.
 
     Args:
@@ -67,6 +83,10 @@ def _run_git(
         cwd: Working directory for the command.
         dry_run: If True, print command without executing.
         check: If True, exit on non-zero return code.
+        capture: If True, capture stdout for the caller. Otherwise stdout is
+            discarded and only stderr is kept (for the error message).
+        text: If True, decode output as text. Off by default since most callers
+            never read it; stderr is decoded on the error path only.
 
     Returns:
         CompletedProcess result.
@@ -79,16 +99,52 @@ def _run_git(
     result = _subprocess.run(
         cmd,
         cwd=cwd,
-        capture_output=True,
-        text=True,
+        stdout=_subprocess.PIPE if capture else _subprocess.DEVNULL,
+        stderr=_subprocess.PIPE,
+        text=text,
     )
     if check and result.returncode != 0:
+        stderr = result.stderr
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode("utf-8", errors="replace")
         _click.echo(f"  ERROR: git {' '.join(args)}", err=True)
-        _click.echo(f"  {result.stderr}", err=True)
+        _click.echo(f"  {stderr}", err=True)
         _sys.exit(1)
     return result
 
 
+def _present_files(
+    files: list[str],
+    repo_path: _pathlib.Path,
+) -> set[str]:
+    """Return the subset of files that exist on disk.
+
+    Lists each parent directory once with os.scandir instead of stat()ing every
+    file, and caches the listing for the other files in that directory. A name
+    missing from its listing still gets an individual lexists() check before it
+    is reported missing: listings never contain "." or "..", and they miss names
+    that differ only by case or Unicode normalization on filesystems that fold
+    those. A symlink counts as present whether or not its target exists, as it
+    does for git.
+    """
+    repo_str = _os.fspath(repo_path)
+    listings: dict[str, set[str]] = {}
+    present: set[str] = set()
+    for f in files:
+        parent, name = _os.path.split(_os.path.normpath(f))
+        names = listings.get(parent)
+        if names is None:
+            try:
+                with _os.scandir(_os.path.join(repo_str, parent)) as it:
+                    names = {entry.name for entry in it}
+            except OSError:
+                names = set()
+            listings[parent] = names
+        if name in names or _os.path.lexists(_os.path.join(repo_str, f)):
+            present.add(f)
+    return present
+
+
 def _validate_files_exist(
     files: list[str],
     repo_path: _pathlib.Path,
@@ -97,12 +153,8 @@ def _validate_files_exist(
 
     Returns list of missing files.
     """
-    missing = []
-    for f in files:
-        path = repo_path / f
-        if not path.exists():
-            missing.append(f)
-    return missing
+    present = _present_files(files, repo_path)
+    return [f for f in files if f not in present]
 
 
 def _validate_deleted_files(
@@ -114,34 +166,38 @@ def _validate_deleted_files(
     Returns:
         Tuple of (still_exist, not_tracked) - files that fail validation.
     """
-    still_exist = []
-    not_tracked = []
+    present = _present_files(files, repo_path)
+    still_exist = [f for f in files if f in present]
+    gone = [f for f in files if f not in present]
 
-    for f in files:
-        path = repo_path / f
-        if path.exists():
-            still_exist.append(f)
-            continue
+    # A single index query covers every path: plain ls-files lists tracked files
+    # whether or not they are still on disk (a superset of --deleted).
+    tracked = _tracked_files(gone, repo_path) if gone else set()
+    not_tracked = [f for f in gone if _pathlib.PurePosixPath(f).as_posix() not in tracked]
+
+    return still_exist, not_tracked
+
+
+def _tracked_files(
+    files: list[str],
+    repo_path: _pathlib.Path,
+) -> set[str]:
+    """Return which of the given paths are in the git index.
 
-        # Check if file is tracked by git (was deleted)
+    Paths are matched literally (no glob pathspecs) and batched to stay under
+    the OS argument-length limit.
+    """
+    tracked: set[str] = set()
+    for batch in _batched(files):
         result = _subprocess.run(
-            ["git", "ls-files", "--deleted", f],
+            ["git", "--literal-pathspecs", "ls-files", "-z", "--", *batch],
             cwd=repo_path,
             capture_output=True,
             text=True,
         )
-        if not result.stdout.strip():
-            # Not in deleted list, check if it's in the index at all
-            result2 = _subprocess.run(
-                ["git", "ls-files", f],
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-            )
-            if not result2.stdout.strip():
-                not_tracked.append(f)
-
-    return still_exist, not_tracked
+        tracked.update(result.stdout.split("\0"))
+    tracked.discard("")
+    return tracked
 
 
 def _find_duplicate_files(
@@ -153,21 +209,31 @@ def _find_duplicate_files(
 
     Returns dict mapping filename to list of commit indices (1-based).
     """
-    file_commits: dict[str, list[int]] = {}
+    # First commit each file was seen in; lists are only built for actual duplicates.
+    seen: dict[str, int] = {}
+    duplicates: dict[str, list[int]] = {}
     for i, commit in enumerate(commits, 1):
-        # Check regular files
-        for f in commit.get("files", []):
-            if f not in file_commits:
-                file_commits[f] = []
-            file_commits[f].append(i)
-        # Check deleted files
-        for f in commit.get("deleted", []):
-            if f not in file_commits:
-                file_commits[f] = []
-            file_commits[f].append(i)
+        for f in _itertools.chain(commit.get("files", ()), commit.get("deleted", ())):
+            if f in duplicates:
+                duplicates[f].append(i)
+            elif f in seen:
+                duplicates[f] = [seen[f], i]
+            else:
+                seen[f] = i
+    return duplicates
+
+
+def _collect_file_sets(
+    commits: list[dict[str, _typing.Any]],
+) -> tuple[set[str], set[str]]:
+    """Return (all_files, all_deleted) across every commit in the plan."""
+    chain = _itertools.chain.from_iterable
+    all_files = set(chain(c.get("files", ()) for c in commits))
+    all_deleted = set(chain(c.get("deleted", ()) for c in commits))
+    return all_files, all_deleted
+
 
-    # Return only duplicates
-    return {f: commits for f, commits in file_commits.items() if len(commits) > 1}
+_SEMVER_TAG_RE = _re.compile(r"^v(\d+\.\d+\.\d+)$")
 
 
 def _validate_tag_version(tag: str, repo_path: _pathlib.Path) -> str | None:
@@ -181,18 +247,22 @@ def _validate_tag_version(tag: str, repo_path: _pathlib.Path) -> str | None:
         Error message if mismatch, None if OK or not applicable.
     """
     # Only validate semver tags (vX.Y.Z)
-    match = _re.match(r"^v(\d+\.\d+\.\d+)$", tag)
+    match = _SEMVER_TAG_RE.match(tag)
     if not match:
         return None  # Not a semver tag, skip validation
 
     tag_version = match.group(1)
     pyproject = repo_path / "pyproject.toml"
-    if not pyproject.exists():
-        return None  # No pyproject.toml, skip
+
+    import tomllib as _tomllib
 
     try:
-        with pyproject.open("rb") as f:
-            data = _tomllib.load(f)
+        raw = pyproject.read_bytes()
+        # No project table (in any TOML spelling) means no version to check:
+        # skip the parse entirely.
+        data = _tomllib.loads(raw.decode("utf-8")) if b"project" in raw else {}
+    except FileNotFoundError:
+        return None  # No pyproject.toml, skip
     except Exception as e:
         return f"Failed to parse pyproject.toml: {e}"
 
@@ -211,8 +281,13 @@ def _validate_tag_version(tag: str, repo_path: _pathlib.Path) -> str | None:
 
 def _load_plan(plan_path: _pathlib.Path) -> dict[str, _typing.Any]:
     """Load commit plan from YAML file."""
-    with plan_path.open() as f:
-        result = _yaml.safe_load(f)
+    raw = plan_path.read_bytes()
+
+    import yaml as _yaml
+
+    # LibYAML-backed loader when PyYAML was built with it; same safe semantics.
+    loader = getattr(_yaml, "CSafeLoader", _yaml.SafeLoader)
+    result = _yaml.load(raw, Loader=loader)
     if not isinstance(result, dict):
         raise ValueError(f"Commit plan must be a YAML mapping, got {type(result).__name__}")
     return _typing.cast(dict[str, _typing.Any], result)
@@ -226,22 +301,31 @@ def _get_repo_path(
 
     Priority:
     1. 'repo' key in plan file (explicit override)
-    2. Walk up from plan file to find .git directory
+    2. Work tree containing the plan file, as reported by git
     3. Fallback to plan file's directory
     """
     # Check for explicit repo path in plan
     if "repo" in plan:
         return _pathlib.Path(plan["repo"]).expanduser().resolve()
 
-    # Walk up to find .git directory
-    current = plan_path.parent.resolve()
-    while current != current.parent:
-        if (current / ".git").exists():
-            return current
-        current = current.parent
+    # Let git do the discovery: one process instead of a stat per parent, and it
+    # also understands .git files (worktrees, submodules) and GIT_DIR.
+    plan_dir = plan_path.parent.resolve()
+    try:
+        result = _subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=plan_dir,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        result = None
+    toplevel = result.stdout.rstrip("\n") if result is not None and result.returncode == 0 else ""
+    if toplevel:
+        return _pathlib.Path(toplevel)
 
-    # Fallback: if no .git found, use the plan file's directory
-    return plan_path.parent.resolve()
+    # Fallback: not inside a work tree, use the plan file's directory
+    return plan_dir
 
 
 def _check_prestaged_files(repo_path: _pathlib.Path) -> list[str]:
@@ -249,18 +333,105 @@ def _check_prestaged_files(repo_path: _pathlib.Path) -> list[str]:
 
     Returns list of staged file paths, empty if none.
     """
+    # -z: raw NUL-separated names, so unusual filenames aren't quoted/escaped.
     result = _subprocess.run(
-        ["git", "diff", "--cached", "--name-only"],
+        ["git", "diff", "--cached", "--name-only", "-z"],
         cwd=repo_path,
         capture_output=True,
         text=True,
     )
     if result.returncode != 0:
         return []
-    staged = result.stdout.strip()
-    if not staged:
-        return []
-    return staged.split("\n")
+    return [name for name in result.stdout.split("\0") if name]
+
+
+def _surely_changed_files(repo_path: _pathlib.Path) -> set[str]:
+    """Return files whose `git add` is certain to stage a change.
+
+    That is untracked files and tracked files deleted from the work tree. Modified
+    files are left out: clean/smudge filters or CRLF normalization can make them
+    show as modified while staging nothing. Uses one `git status` for the whole run.
+    """
+    result = _subprocess.run(
+        ["git", "status", "--porcelain=v2", "-z", "--untracked-files=all"],
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+    )
+    changed: set[str] = set()
+    records = iter(result.stdout.split("\0"))
+    for record in records:
+        kind = record[:1]
+        if kind == "1":
+            if record[3:4] == "D":
+                changed.add(record.split(" ", 8)[8])
+        elif kind == "2":
+            next(records, None)  # rename/copy source follows as its own field
+        elif kind == "?":
+            changed.add(record[2:])
+    return changed
+
+
+def _covered_by(path: str, staged: set[str]) -> bool:
+    """Return True if path, or a directory containing it, is in staged."""
+    pure = _pathlib.PurePosixPath(path)
+    return any(str(p) in staged for p in (pure, *pure.parents))
+
+
+def _has_staged_changes(repo_path: _pathlib.Path) -> bool:
+    """Return True if the index differs from HEAD."""
+    result = _subprocess.run(["git", "diff", "--cached", "--quiet"], cwd=repo_path)
+    return result.returncode != 0
+
+
+@_dataclasses.dataclass(frozen=True, slots=True)
+class _PlanData:
+    """Plan-wide file sets and the outcome of validating them."""
+
+    all_files: frozenset[str]
+    all_deleted: frozenset[str]
+    duplicates: dict[str, list[int]]
+    missing: list[str]
+    still_exist: list[str]
+    not_tracked: list[str]
+
+    @property
+    def has_file_errors(self) -> bool:
+        return bool(self.missing or self.still_exist or self.not_tracked)
+
+
+def _validate_plan(
+    plan: dict[str, _typing.Any],
+    repo_path: _pathlib.Path,
+) -> _PlanData:
+    """Collect the plan's file sets and run the file checks once for both modes."""
+    commits = plan.get("commits", [])
+    all_files, all_deleted = _collect_file_sets(commits)
+    missing = _validate_files_exist(list(all_files), repo_path) if all_files else []
+    still_exist, not_tracked = (
+        _validate_deleted_files(list(all_deleted), repo_path) if all_deleted else ([], [])
+    )
+    return _PlanData(
+        all_files=frozenset(all_files),
+        all_deleted=frozenset(all_deleted),
+        duplicates=_find_duplicate_files(commits),
+        missing=missing,
+        still_exist=still_exist,
+        not_tracked=not_tracked,
+    )
+
+
+def _echo_file_errors(data: _PlanData) -> None:
+    """Report missing files and invalid deletions to stderr."""
+    for heading, files in (
+        ("Missing files:", data.missing),
+        ("Files marked for deletion still exist:", data.still_exist),
+        ("Deleted files not tracked by git:", data.not_tracked),
+    ):
+        if files:
+            _click.echo(f"ERROR: {heading}", err=True)
+            for f in files:
+                _click.echo(f"  - {f}", err=True)
 
 
 def _preview(
@@ -294,87 +465,53 @@ def _preview(
             _click.echo(f"ERROR: {version_error}", err=True)
             return False
 
-    commits = plan.get("commits", [])
+    data = _validate_plan(plan, repo_path)
 
     # Check for duplicate files (same file in multiple commits)
-    duplicates = _find_duplicate_files(commits)
-    if duplicates:
+    if data.duplicates:
         _click.echo("ERROR: Files appear in multiple commits:", err=True)
         _click.echo("(Each file can only be in ONE commit - hunking not supported)", err=True)
-        for f, commit_nums in sorted(duplicates.items()):
+        for f, commit_nums in sorted(data.duplicates.items()):
             _click.echo(f"  - {f} → commits {commit_nums}", err=True)
         return False
 
-    # Collect all files and deleted files
-    all_files: set[str] = set()
-    all_deleted: set[str] = set()
-    for commit in commits:
-        all_files.update(commit.get("files", []))
-        all_deleted.update(commit.get("deleted", []))
-
-    # Validate files exist
-    has_errors = False
-    if all_files:
-        missing = _validate_files_exist(list(all_files), repo_path)
-        if missing:
-            _click.echo("ERROR: Missing files:", err=True)
-            for f in missing:
-                _click.echo(f"  - {f}", err=True)
-            has_errors = True
-        else:
-            _click.echo(
-                _click.style(f"✓ All {len(all_files)} files exist", fg="green")
-            )
-
-    # Validate deleted files
-    if all_deleted:
-        still_exist, not_tracked = _validate_deleted_files(list(all_deleted), repo_path)
-        if still_exist:
-            _click.echo("ERROR: Files marked for deletion still exist:", err=True)
-            for f in still_exist:
-                _click.echo(f"  - {f}", err=True)
-            has_errors = True
-        if not_tracked:
-            _click.echo("ERROR: Deleted files not tracked by git:", err=True)
-            for f in not_tracked:
-                _click.echo(f"  - {f}", err=True)
-            has_errors = True
-        if not still_exist and not not_tracked:
-            _click.echo(
-                _click.style(f"✓ All {len(all_deleted)} deletions valid", fg="green")
-            )
-
-    if has_errors:
+    # Validate files exist and deletions are valid
+    if data.has_file_errors:
+        _echo_file_errors(data)
         return False
+    if data.all_files:
+        _click.echo(_click.style(f"✓ All {len(data.all_files)} files exist", fg="green"))
+    if data.all_deleted:
+        _click.echo(_click.style(f"✓ All {len(data.all_deleted)} deletions valid", fg="green"))
 
     _click.echo()
 
     # Show each commit
     for i, commit in enumerate(plan.get("commits", []), 1):
-        msg_lines = commit["message"].strip().split("\n")
-        title = msg_lines[0]
+        # Only the first line is shown; don't split the whole message.
+        title = commit["message"].strip().partition("\n")[0]
         files = commit.get("files", [])
         deleted = commit.get("deleted", [])
 
-        _click.echo(f"--- Commit {i}: {title} ---")
+        # Build the whole section and write it once.
+        lines = [f"--- Commit {i}: {title} ---"]
 
         # Show added/modified files
         if files:
-            _click.echo(f"Files ({len(files)}):")
-            for f in files[:5]:
-                _click.echo(f"  + {f}")
+            lines.append(f"Files ({len(files)}):")
+            lines.extend(f"  + {f}" for f in files[:5])
             if len(files) > 5:
-                _click.echo(f"  ... and {len(files) - 5} more")
+                lines.append(f"  ... and {len(files) - 5} more")
 
         # Show deleted files
         if deleted:
-            _click.echo(f"Deleted ({len(deleted)}):")
-            for f in deleted[:5]:
-                _click.echo(_click.style(f"  - {f}", fg="red"))
+            lines.append(f"Deleted ({len(deleted)}):")
+            lines.extend(_click.style(f"  - {f}", fg="red") for f in deleted[:5])
             if len(deleted) > 5:
-                _click.echo(f"  ... and {len(deleted) - 5} more")
+                lines.append(f"  ... and {len(deleted) - 5} more")
 
-        _click.echo()
+        lines.append("")
+        _click.echo("\n".join(lines))
 
     return True
 
@@ -413,60 +550,42 @@ def _execute(
             _click.echo("  3. Stash them: git stash", err=True)
             _sys.exit(1)
 
-    # Collect and validate all files
-    all_files: set[str] = set()
-    all_deleted: set[str] = set()
-    for commit in plan.get("commits", []):
-        all_files.update(commit.get("files", []))
-        all_deleted.update(commit.get("deleted", []))
-
-    # Validate files exist
-    if all_files:
-        missing = _validate_files_exist(list(all_files), repo_path)
-        if missing:
-            _click.echo("ERROR: Missing files:", err=True)
-            for f in missing:
-                _click.echo(f"  - {f}", err=True)
-            _sys.exit(1)
+    # Validate all files
+    data = _validate_plan(plan, repo_path)
+    if data.has_file_errors:
+        _echo_file_errors(data)
+        _sys.exit(1)
 
-    # Validate deleted files
-    if all_deleted:
-        still_exist, not_tracked = _validate_deleted_files(list(all_deleted), repo_path)
-        if still_exist:
-            _click.echo("ERROR: Files marked for deletion still exist:", err=True)
-            for f in still_exist:
-                _click.echo(f"  - {f}", err=True)
-            _sys.exit(1)
-        if not_tracked:
-            _click.echo("ERROR: Deleted files not tracked by git:", err=True)
-            for f in not_tracked:
-                _click.echo(f"  - {f}", err=True)
-            _sys.exit(1)
+    # Snapshot files that will certainly stage a change, so commits naming one of
+    # them can skip the `git diff --cached` check. Anything else (modified files,
+    # directories, globs, non-normalized paths, or a file an earlier commit already
+    # staged) still gets the real check.
+    surely_changed = _surely_changed_files(repo_path) if not dry_run else set()
+    staged: set[str] = set()
 
     # Execute each commit
     for i, commit in enumerate(plan.get("commits", []), 1):
         msg = commit["message"].strip()
         files = commit.get("files", [])
         deleted = commit.get("deleted", [])
-        title = msg.split("\n")[0]
+        title = msg.partition("\n")[0]
 
         _click.echo(f">>> Commit {i}: {title}")
 
-        # Stage added/modified files
-        for f in files:
-            _run_git(["add", f], repo_path, dry_run)
+        # Stage added/modified files (one git call per batch, not per file)
+        for batch in _batched(files):
+            _run_git(["add", "--", *batch], repo_path, dry_run)
 
         # Stage deleted files
-        for f in deleted:
-            _run_git(["rm", "--cached", f], repo_path, dry_run)
+        for batch in _batched(deleted):
+            _run_git(["rm", "--cached", "--", *batch], repo_path, dry_run)
 
         # Check if there are staged changes
         if not dry_run:
-            result = _subprocess.run(
-                ["git", "diff", "--cached", "--quiet"],
-                cwd=repo_path,
-            )
-            if result.returncode == 0:
+            paths = [_os.path.normpath(f).replace(_os.sep, "/") for f in (*files, *deleted)]
+            surely = any(p in surely_changed and not _covered_by(p, staged) for p in paths)
+            staged.update(paths)
+            if not surely and not _has_staged_changes(repo_path):
                 _click.echo("  (no changes to commit, skipping)")
                 continue
 
@@ -488,10 +607,12 @@ def _execute(
     _click.echo("=== Done ===")
     if not dry_run:
         commit_count = len(plan.get("commits", []))
-        _run_git(["log", "--oneline", f"-{commit_count}"], repo_path, dry_run)
+        result = _run_git(["log", "--oneline", f"-{commit_count}"], repo_path, dry_run, capture=True, text=True)
+        _click.echo(result.stdout, nl=False)
         if tag_name:
             _click.echo()
-            _run_git(["tag", "-l", tag_name], repo_path, dry_run)
+            result = _run_git(["tag", "-l", tag_name], repo_path, dry_run, capture=True, text=True)
+            _click.echo(result.stdout, nl=False)
 
 
 @_click.command()
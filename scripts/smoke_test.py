@@ -14,6 +14,7 @@ Usage:
 import asyncio as _asyncio
 import sys as _sys
 import pathlib as _pathlib
+import typing as _typing
 
 # Add project root to path for standalone testing
 _project_root = _pathlib.Path(__file__).resolve().parent.parent
@@ -21,85 +22,103 @@ _sys.path.insert(0, str(_project_root))
 
 import brynhild_deno_plugin.tools.python_sandbox as python_sandbox  # noqa: E402
 
+# (title, setup calls run first in order, checked call, pass predicate)
+_Case = tuple[
+    str,
+    list[dict[str, _typing.Any]],
+    dict[str, _typing.Any],
+    _typing.Callable[[_typing.Any], bool],
+]
+
+TESTS: list[_Case] = [
+    (
+        "Basic calculation (2+2)",
+        [],
+        {"code": "2 + 2"},
+        lambda r: r.success and "4" in r.output,
+    ),
+    (
+        "Print + expression",
+        [],
+        {"code": "print('hello'); 'world'"},
+        lambda r: r.success and "hello" in r.output and "world" in r.output,
+    ),
+    (
+        "Syntax error handling",
+        [],
+        {"code": "def broken("},
+        lambda r: not r.success and "SyntaxError" in (r.error or ""),
+    ),
+    (
+        "State persistence (variable defined in first call)",
+        [{"code": "x = 42"}],
+        {"code": "x * 2"},
+        lambda r: r.success and "84" in r.output,
+    ),
+    (
+        "Reset clears state",
+        [{"code": "y = 100"}],
+        {"code": "y", "reset": True},
+        lambda r: not r.success and "NameError" in (r.error or ""),
+    ),
+    (
+        "Files in sandbox",
+        [],
+        {
+            "code": "open('data.txt').read()",
+            "files": {"data.txt": "file contents here"},
+            "reset": True,
+        },
+        lambda r: r.success and "file contents here" in r.output,
+    ),
+]
+
+
+def _is_independent(case: _Case) -> bool:
+    """Cases with no setup and no reset don't depend on (or disturb) shared state."""
+    _title, setup, payload, _check = case
+    return not setup and not payload.get("reset")
+
+
+async def _run_case(tool: python_sandbox.Tool, case: _Case) -> _typing.Any:
+    _title, setup, payload, _check = case
+    for step in setup:
+        await tool.execute(step)
+    return await tool.execute(payload)
+
 
 async def main() -> int:
     """Run smoke tests and return exit code (0 = success)."""
     print("=== Smoke Test: python_sandbox ===\n")
 
     tool = python_sandbox.Tool()
-    failures = 0
 
-    # Test 1: Basic calculation
-    print("Test 1: Basic calculation (2+2)")
-    result = await tool.execute({"code": "2 + 2"})
-    print(f"  Success: {result.success}")
-    print(f"  Output: {result.output.strip()}")
-    if result.success and "4" in result.output:
-        print("  ✓ PASS\n")
-    else:
-        print(f"  ✗ FAIL (error: {result.error})\n")
-        failures += 1
-
-    # Test 2: Print + expression
-    print("Test 2: Print + expression")
-    result = await tool.execute({"code": "print('hello'); 'world'"})
-    print(f"  Success: {result.success}")
-    print(f"  Output: {result.output.strip()[:100]}")
-    if result.success and "hello" in result.output and "world" in result.output:
-        print("  ✓ PASS\n")
-    else:
-        print(f"  ✗ FAIL (error: {result.error})\n")
-        failures += 1
-
-    # Test 3: Syntax error
-    print("Test 3: Syntax error handling")
-    result = await tool.execute({"code": "def broken("})
-    print(f"  Success: {result.success}")
-    error_snippet = (result.error or "")[:60] + "..." if result.error else "None"
-    print(f"  Error: {error_snippet}")
-    if not result.success and result.error and "SyntaxError" in result.error:
-        print("  ✓ PASS\n")
-    else:
-        print("  ✗ FAIL (expected SyntaxError)\n")
-        failures += 1
-
-    # Test 4: State persistence across calls
-    print("Test 4: State persistence (variable defined in first call)")
-    await tool.execute({"code": "x = 42"})
-    result = await tool.execute({"code": "x * 2"})
-    print(f"  Success: {result.success}")
-    print(f"  Output: {result.output.strip()}")
-    if result.success and "84" in result.output:
-        print("  ✓ PASS\n")
-    else:
-        print(f"  ✗ FAIL (error: {result.error})\n")
-        failures += 1
-
-    # Test 5: Reset clears state
-    print("Test 5: Reset clears state")
-    await tool.execute({"code": "y = 100"})
-    result = await tool.execute({"code": "y", "reset": True})
-    print(f"  Success: {result.success}")
-    if not result.success and "NameError" in (result.error or ""):
-        print("  ✓ PASS (NameError as expected after reset)\n")
-    else:
-        print(f"  ✗ FAIL (expected NameError, got: {result.error})\n")
-        failures += 1
-
-    # Test 6: Files in sandbox
-    print("Test 6: Files in sandbox")
-    result = await tool.execute({
-        "code": "open('data.txt').read()",
-        "files": {"data.txt": "file contents here"},
-        "reset": True,
-    })
-    print(f"  Success: {result.success}")
-    print(f"  Output: {result.output.strip()[:60]}")
-    if result.success and "file contents here" in result.output:
-        print("  ✓ PASS\n")
-    else:
-        print(f"  ✗ FAIL (error: {result.error})\n")
-        failures += 1
+    # Independent cases run concurrently (they fan out across the worker pool, if
+    # any); stateful ones then run in order.
+    results: dict[int, _typing.Any] = {}
+    independent = [i for i, case in enumerate(TESTS) if _is_independent(case)]
+    for i, result in zip(independent, await _asyncio.gather(*(_run_case(tool, TESTS[i]) for i in independent))):
+        results[i] = result
+    for i, case in enumerate(TESTS):
+        if i not in results:
+            results[i] = await _run_case(tool, case)
+
+    failures = 0
+    lines: list[str] = []
+    for i, (title, _setup, _payload, check) in enumerate(TESTS):
+        result = results[i]
+        lines.append(f"Test {i + 1}: {title}")
+        lines.append(f"  Success: {result.success}")
+        if result.success:
+            lines.append(f"  Output: {result.output.strip()[:100]}")
+        else:
+            lines.append(f"  Error: {(result.error or 'None')[:60]}")
+        if check(result):
+            lines.append("  ✓ PASS\n")
+        else:
+            lines.append(f"  ✗ FAIL (error: {result.error})\n")
+            failures += 1
+    print("\n".join(lines))
 
     # Summary
     print("=" * 40)
@@ -114,4 +133,3 @@ async def main() -> int:
 if __name__ == "__main__":
     exit_code = _asyncio.run(main())
     _sys.exit(exit_code)
-
@@ -0,0 +1,22 @@
+"""Shared pytest configuration: the opt-in ``slow`` marker."""
+
+import pytest as _pytest
+
+
+def pytest_addoption(parser: _pytest.Parser) -> None:
+    parser.addoption(
+        "--run-slow",
+        action="store_true",
+        default=False,
+        help="Also run tests marked slow (skipped by default).",
+    )
+
+
+def pytest_collection_modifyitems(config: _pytest.Config, items: list[_pytest.Item]) -> None:
+    """Skip tests marked slow unless --run-slow was given."""
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = _pytest.mark.skip(reason="slow; use --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
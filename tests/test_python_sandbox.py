@@ -4,47 +4,70 @@ These tests verify the claims made in the capabilities documentation.
 """
 
 import asyncio as _asyncio
+import dataclasses as _dataclasses
 import json as _json
 import pytest as _pytest
 
 import brynhild_deno_plugin.tools.python_sandbox as python_sandbox
 
 
-@_pytest.fixture
+@_pytest.fixture(scope="session")
 def tool():
-    """Create a fresh tool instance for each test."""
+    """One tool instance (and Deno/Pyodide process) shared by the whole session.
+
+    Booting Pyodide dominates the cost of a test, so tests don't get a fresh
+    interpreter: each one uses its own names and files rather than relying on a
+    clean slate. Tests that need one pass reset=True themselves. There is no
+    automatic per-test reset, since a reset respawns the process.
+    """
     return python_sandbox.Tool()
 
 
-@_pytest.fixture
-def event_loop():
-    """Create event loop for async tests."""
-    loop = _asyncio.new_event_loop()
-    yield loop
-    loop.close()
+# Stdlib modules the tests import. Loading them once up front turns each test's
+# import into a sys.modules hit instead of a read + compile inside Pyodide.
+_WARM_MODULES = (
+    "ast", "base64", "collections", "csv", "datetime", "hashlib",
+    "io", "itertools", "json", "math", "pathlib", "re",
+)
+
 
+# Every test and fixture here runs on the one session-wide loop that pytest-asyncio
+# provides (asyncio_mode = "auto"): the session-scoped tool's queue and subprocess
+# transports are bound to the loop they were first used on.
+pytestmark = _pytest.mark.asyncio(loop_scope="session")
 
-def run_async(coro):
-    """Helper to run async code in sync tests."""
-    return _asyncio.get_event_loop().run_until_complete(coro)
+
+@_pytest.fixture(scope="session", autouse=True)
+async def _warm_stdlib(tool):
+    """Import _WARM_MODULES into the sandbox once per session.
+
+    Uses __import__ so no names are bound in the user namespace; tests that
+    check import persistence still have to import for themselves.
+    """
+    code = (
+        f"for _warm_module in {_WARM_MODULES!r}:\n"
+        "    __import__(_warm_module)\n"
+        "del _warm_module"
+    )
+    await tool.execute({"code": code})
 
 
 class TestBasicExecution:
     """Test basic code execution capabilities."""
 
-    def test_simple_expression(self, tool):
+    async def test_simple_expression(self, tool):
         """Basic expression evaluation returns result."""
-        result = run_async(tool.execute({"code": "2 + 2"}))
+        result = await tool.execute({"code": "2 + 2"})
         assert result.success is True
         assert "4" in result.output
 
-    def test_print_statement(self, tool):
+    async def test_print_statement(self, tool):
         """Print statements are captured in stdout."""
-        result = run_async(tool.execute({"code": "print('hello world')"}))
+        result = await tool.execute({"code": "print('hello world')"})
         assert result.success is True
         assert "hello world" in result.output
 
-    def test_multiline_code(self, tool):
+    async def test_multiline_code(self, tool):
         """Multi-line code with functions works."""
         code = """
 def factorial(n):
@@ -54,46 +77,59 @@ def factorial(n):
 
 factorial(5)
 """
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         assert "120" in result.output
 
-    def test_print_and_expression(self, tool):
+    async def test_print_and_expression(self, tool):
         """Both print output and expression result are captured."""
-        result = run_async(tool.execute({"code": "print('side effect'); 42"}))
+        result = await tool.execute({"code": "print('side effect'); 42"})
         assert result.success is True
         assert "side effect" in result.output
         assert "42" in result.output
 
 
+class TestToolMetadata:
+    """Test the tool's static metadata."""
+
+    def test_input_schema_edits_do_not_leak(self, tool):
+        """Each input_schema access is a private copy; editing one leaves later ones intact."""
+        schema = tool.input_schema
+        schema["properties"]["code"]["description"] = "edited"
+        del schema["properties"]["pythonpath"]
+        fresh = python_sandbox.Tool().input_schema
+        assert fresh["properties"]["code"]["description"] != "edited"
+        assert "pythonpath" in fresh["properties"]
+
+
 class TestStatePersistence:
     """Test state persistence across calls."""
 
-    def test_variable_persists(self, tool):
+    async def test_variable_persists(self, tool):
         """Variables defined in one call persist to the next."""
-        run_async(tool.execute({"code": "x = 42"}))
-        result = run_async(tool.execute({"code": "x * 2"}))
+        await tool.execute({"code": "x = 42"})
+        result = await tool.execute({"code": "x * 2"})
         assert result.success is True
         assert "84" in result.output
 
-    def test_function_persists(self, tool):
+    async def test_function_persists(self, tool):
         """Functions defined in one call can be called later."""
-        run_async(tool.execute({"code": "def double(n): return n * 2"}))
-        result = run_async(tool.execute({"code": "double(21)"}))
+        await tool.execute({"code": "def double(n): return n * 2"})
+        result = await tool.execute({"code": "double(21)"})
         assert result.success is True
         assert "42" in result.output
 
-    def test_import_persists(self, tool):
+    async def test_import_persists(self, tool):
         """Imports persist across calls."""
-        run_async(tool.execute({"code": "import math"}))
-        result = run_async(tool.execute({"code": "math.pi"}))
+        await tool.execute({"code": "import math"})
+        result = await tool.execute({"code": "math.pi"})
         assert result.success is True
         assert "3.14" in result.output
 
-    def test_reset_clears_state(self, tool):
+    async def test_reset_clears_state(self, tool):
         """Reset clears all state."""
-        run_async(tool.execute({"code": "persistent_var = 123"}))
-        result = run_async(tool.execute({"code": "persistent_var", "reset": True}))
+        await tool.execute({"code": "persistent_var = 123"})
+        result = await tool.execute({"code": "persistent_var", "reset": True})
         assert result.success is False
         assert "NameError" in (result.error or result.output)
 
@@ -101,145 +137,136 @@ class TestStatePersistence:
 class TestErrorHandling:
     """Test error handling capabilities."""
 
-    def test_syntax_error(self, tool):
+    async def test_syntax_error(self, tool):
         """Syntax errors are reported."""
-        result = run_async(tool.execute({"code": "def broken("}))
+        result = await tool.execute({"code": "def broken("})
         assert result.success is False
         assert "SyntaxError" in (result.error or result.output)
 
-    def test_runtime_error(self, tool):
+    async def test_runtime_error(self, tool):
         """Runtime errors are reported with traceback."""
-        result = run_async(tool.execute({"code": "1 / 0"}))
+        result = await tool.execute({"code": "1 / 0"})
         assert result.success is False
         assert "ZeroDivisionError" in (result.error or result.output)
 
-    def test_undefined_variable(self, tool):
+    async def test_undefined_variable(self, tool):
         """NameError for undefined variables."""
-        result = run_async(tool.execute({"code": "undefined_var"}))
+        result = await tool.execute({"code": "undefined_var"})
         assert result.success is False
         assert "NameError" in (result.error or result.output)
 
+    @_pytest.mark.parametrize("extra,message", [
+        _pytest.param({"packages": [1, None]}, "packages must be an array of strings", id="packages"),
+        _pytest.param({"pythonpath": [{"a": 1}]}, "pythonpath must be an array of strings", id="pythonpath"),
+        _pytest.param({"files": {1: "x"}}, "files must map string paths", id="file-key"),
+        _pytest.param({"files": {"a.txt": 123}}, "files must map string paths", id="file-int"),
+        _pytest.param({"files": {"a.txt": {"x": [1]}}}, "files must map string paths", id="file-dict"),
+    ])
+    async def test_non_string_elements_rejected(self, tool, extra, message):
+        """Non-str packages/pythonpath elements and file keys/values are rejected up front."""
+        result = await tool.execute({"code": "1", **extra})
+        assert result.success is False
+        assert message in (result.error or "")
+
+    @_pytest.mark.parametrize("orjson", [True, False], ids=["orjson", "stdlib"])
+    @_pytest.mark.parametrize("extra", [
+        _pytest.param({"code": "'\ud800'"}, id="code"),
+        _pytest.param({"files": {"s.txt": "\ud800"}}, id="file"),
+    ])
+    async def test_lone_surrogate_input_rejected(self, tool, monkeypatch, orjson, extra):
+        """A lone surrogate in the request is an invalid payload under either JSON codec."""
+        if orjson:
+            _pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(python_sandbox, "_orjson", None)
+        result = await tool.execute({"code": "1", **extra})
+        assert result.success is False
+        assert "invalid payload" in (result.error or "")
+
 
 class TestFileSystem:
     """Test virtual filesystem capabilities."""
 
-    def test_file_injection(self, tool):
+    async def test_file_injection(self, tool):
         """Files can be injected and read."""
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "open('test.txt').read()",
             "files": {"test.txt": "hello from file"}
-        }))
+        })
         assert result.success is True
         assert "hello from file" in result.output
 
-    def test_file_write_and_read(self, tool):
+    async def test_file_write_and_read(self, tool):
         """Files written in sandbox can be read back."""
-        run_async(tool.execute({
+        await tool.execute({
             "code": "open('output.txt', 'w').write('written data')"
-        }))
-        result = run_async(tool.execute({
+        })
+        result = await tool.execute({
             "code": "open('output.txt').read()"
-        }))
+        })
         assert result.success is True
         assert "written data" in result.output
 
-    def test_nested_directory(self, tool):
+    async def test_nested_directory(self, tool):
         """Files can be injected into nested directories."""
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "open('subdir/nested/file.txt').read()",
             "files": {"subdir/nested/file.txt": "nested content"}
-        }))
+        })
         assert result.success is True
         assert "nested content" in result.output
 
-
-class TestStdlibModules:
-    """Test that standard library modules work."""
-
-    def test_json(self, tool):
-        """json module works."""
-        code = 'import json; json.dumps({"key": "value"})'
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "key" in result.output
-
-    def test_math(self, tool):
-        """math module works."""
-        result = run_async(tool.execute({"code": "import math; math.sqrt(16)"}))
-        assert result.success is True
-        assert "4" in result.output
-
-    def test_datetime(self, tool):
-        """datetime module works."""
-        code = "from datetime import date; date(2026, 1, 10).isoformat()"
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "2026-01-10" in result.output
-
-    def test_collections(self, tool):
-        """collections module works."""
-        code = "from collections import Counter; Counter('abracadabra').most_common(1)"
-        result = run_async(tool.execute({"code": code}))
+    async def test_bytes_file_injection(self, tool):
+        """Python callers can pass file contents as UTF-8 bytes."""
+        result = await tool.execute({
+            "code": "open('bytes.txt', encoding='utf-8').read()",
+            "files": {"bytes.txt": "caf\u00e9 bytes".encode("utf-8")}
+        })
         assert result.success is True
-        assert "a" in result.output
+        assert "caf\u00e9 bytes" in result.output
+
+
+# (code, expected substring of the output) per stdlib module. All of them run in one
+# execute_batch round-trip (stdlib_results); each case is still its own test item.
+STDLIB_CASES = [
+    _pytest.param('import json; json.dumps({"key": "value"})', "key", id="json"),
+    _pytest.param("import math; math.sqrt(16)", "4", id="math"),
+    _pytest.param("from datetime import date; date(2026, 1, 10).isoformat()", "2026-01-10", id="datetime"),
+    _pytest.param("from collections import Counter; Counter('abracadabra').most_common(1)", "a", id="collections"),
+    _pytest.param("from itertools import permutations; list(permutations([1,2], 2))", "(1, 2)", id="itertools"),
+    _pytest.param("import re; re.findall(r'\\d+', 'a1b2c3')", "1", id="re"),
+    # pathlib works with the virtual filesystem.
+    _pytest.param("from pathlib import Path; Path('/work').exists()", "True", id="pathlib"),
+    _pytest.param(
+        "import csv, io; list(csv.reader(io.StringIO('a,b,c\\n1,2,3')))", "['a', 'b', 'c']", id="csv",
+    ),
+    _pytest.param("import hashlib; hashlib.md5(b'test').hexdigest()[:8]", "098f6bcd", id="hashlib"),
+    _pytest.param("import base64; base64.b64encode(b'hello').decode()", "aGVsbG8=", id="base64"),
+    _pytest.param("import ast; ast.parse('x = 1').body[0].__class__.__name__", "Assign", id="ast"),
+]
+
+
+@_pytest.fixture(scope="session")
+async def stdlib_results(tool):
+    """Run every STDLIB_CASES snippet in one execute_batch round-trip, keyed by code."""
+    codes = [case.values[0] for case in STDLIB_CASES]
+    results = await tool.execute_batch([{"code": code} for code in codes])
+    return dict(zip(codes, results))
 
-    def test_itertools(self, tool):
-        """itertools module works."""
-        code = "from itertools import permutations; list(permutations([1,2], 2))"
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "(1, 2)" in result.output
 
-    def test_re(self, tool):
-        """re module works."""
-        code = "import re; re.findall(r'\\d+', 'a1b2c3')"
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "1" in result.output
-
-    def test_pathlib(self, tool):
-        """pathlib module works with virtual filesystem."""
-        code = "from pathlib import Path; Path('/work').exists()"
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "True" in result.output
-
-    def test_csv(self, tool):
-        """csv module works."""
-        code = """
-import csv
-import io
-data = 'a,b,c\\n1,2,3'
-list(csv.reader(io.StringIO(data)))
-"""
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "['a', 'b', 'c']" in result.output
-
-    def test_hashlib(self, tool):
-        """hashlib module works."""
-        code = "import hashlib; hashlib.md5(b'test').hexdigest()[:8]"
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "098f6bcd" in result.output
-
-    def test_base64(self, tool):
-        """base64 module works."""
-        code = "import base64; base64.b64encode(b'hello').decode()"
-        result = run_async(tool.execute({"code": code}))
-        assert result.success is True
-        assert "aGVsbG8=" in result.output
+class TestStdlibModules:
+    """Test that standard library modules work."""
 
-    def test_ast(self, tool):
-        """ast module works."""
-        code = "import ast; ast.parse('x = 1').body[0].__class__.__name__"
-        result = run_async(tool.execute({"code": code}))
+    @_pytest.mark.parametrize("code,expected", STDLIB_CASES)
+    async def test_stdlib(self, stdlib_results, code, expected):
+        """The module imports and produces the expected output."""
+        result = stdlib_results[code]
         assert result.success is True
-        assert "Assign" in result.output
+        assert expected in result.output
 
-    def test_sqlite3_not_available(self, tool):
+    async def test_sqlite3_not_available(self, tool):
         """sqlite3 is NOT available in Pyodide core (would need vendoring)."""
-        result = run_async(tool.execute({"code": "import sqlite3"}))
+        result = await tool.execute({"code": "import sqlite3"})
         assert result.success is False
         assert "ModuleNotFoundError" in (result.error or result.output)
 
@@ -247,18 +274,18 @@ list(csv.reader(io.StringIO(data)))
 class TestOutputFormats:
     """Test output format options."""
 
-    def test_text_format_default(self, tool):
+    async def test_text_format_default(self, tool):
         """Default text format has labeled sections."""
-        result = run_async(tool.execute({"code": "print('out'); 42"}))
+        result = await tool.execute({"code": "print('out'); 42"})
         assert result.success is True
         assert "stdout:" in result.output or "result:" in result.output
 
-    def test_json_format(self, tool):
+    async def test_json_format(self, tool):
         """JSON format returns parseable JSON."""
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "print('hello'); 42",
             "format": "json"
-        }))
+        })
         assert result.success is True
         # Output should be valid JSON
         data = _json.loads(result.output)
@@ -266,48 +293,152 @@ class TestOutputFormats:
         assert "hello" in data["stdout"]
         assert "42" in data["result"]
 
+    @_pytest.mark.parametrize("fmt", ["text", "json"])
+    async def test_lone_surrogate_output(self, tool, fmt):
+        """Output holding a lone surrogate (valid Python, not valid UTF-8) still comes back."""
+        result = await tool.execute({"code": "print('a\\ud800b'); 'done'", "format": fmt})
+        assert result.success is True
+        assert "a\ud800b" in result.output
+        assert "done" in result.output
+
+
+class TestBatchExecution:
+    """Test running several calls in one runner round-trip."""
+
+    async def test_batch_results_in_order(self, tool):
+        """Each call gets its own result, in order, sharing interpreter state."""
+        results = await tool.execute_batch([
+            {"code": "batch_var = 7"},
+            {"code": "batch_var * 6"},
+            {"code": "print('batched')"},
+        ])
+        assert [r.success for r in results] == [True, True, True]
+        assert "42" in results[1].output
+        assert "batched" in results[2].output
+
+    async def test_batch_item_failures_are_isolated(self, tool):
+        """Invalid or failing items don't affect the rest of the batch."""
+        results = await tool.execute_batch([
+            {"code": ""},
+            {"code": "1 / 0"},
+            {"code": "2 + 2"},
+            {"code": "3", "reset": True},
+        ])
+        assert results[0].success is False
+        assert "code is required" in (results[0].error or "")
+        assert results[1].success is False
+        assert "ZeroDivisionError" in (results[1].error or results[1].output)
+        assert results[2].success is True
+        assert "4" in results[2].output
+        assert results[3].success is False
+        assert "first call of a batch" in (results[3].error or "")
+
+
+@_pytest.fixture
+async def pool_tool(monkeypatch):
+    """A private tool with a two-worker pool, its processes killed afterwards."""
+    monkeypatch.setattr(python_sandbox, "_ENV", _dataclasses.replace(python_sandbox._ENV, pool_size=2))
+    monkeypatch.setattr(python_sandbox._os, "cpu_count", lambda: 2)
+    pool = python_sandbox.Tool()
+    yield pool
+    for worker in pool._workers:
+        await pool._kill_proc_locked(worker)
+
+
+# Busy loop rather than time.sleep, so the call holds its worker for a known time.
+_HOLD_WORKER_CODE = (
+    "import time as _t\n"
+    "_end = _t.monotonic() + 1.0\n"
+    "while _t.monotonic() < _end: pass"
+)
+
+
+class TestWorkerPool:
+    """Test the persistent worker pool: reset semantics and dead-runner recovery."""
+
+    async def test_reset_replaces_busy_worker(self, pool_tool):
+        """A reset during an overlapping call also clears the worker serving that call."""
+        busy = _asyncio.create_task(
+            pool_tool.execute({"code": "pool_marker = 1\n" + _HOLD_WORKER_CODE})
+        )
+        await _asyncio.sleep(0)  # let the busy call take its worker
+        reset = await pool_tool.execute({"code": "1", "reset": True})
+        assert reset.success is True
+        assert (await busy).success is True
+
+        # Two overlapping calls land on both workers; neither may see the old state.
+        results = await _asyncio.gather(
+            pool_tool.execute({"code": "pool_marker"}),
+            pool_tool.execute({"code": "pool_marker"}),
+        )
+        for result in results:
+            assert result.success is False
+            assert "NameError" in (result.error or result.output)
+
+    async def test_dead_worker_is_retried_once(self, pool_tool, monkeypatch):
+        """A runner that died while idle is replaced, and the call is retried on the new one."""
+        assert (await pool_tool.execute({"code": "1"})).success is True
+        worker = next(w for w in pool_tool._workers if w.proc is not None)
+        dead = worker.proc
+        dead.kill()
+        await dead.wait()
+
+        spawns = []
+        spawn = pool_tool._spawn_proc_locked
+
+        async def counting_spawn(**kwargs):
+            spawns.append(kwargs)
+            return await spawn(**kwargs)
+
+        monkeypatch.setattr(pool_tool, "_spawn_proc_locked", counting_spawn)
+        result = await pool_tool.execute({"code": "2 + 2"})
+        assert result.success is True
+        assert "4" in result.output
+        assert worker.proc is not dead
+        assert len(spawns) == 1
+
 
 class TestResourceLimits:
     """Test resource control capabilities."""
 
-    def test_timeout_parameter_accepted(self, tool):
+    async def test_timeout_parameter_accepted(self, tool):
         """timeout_ms parameter is accepted."""
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "1 + 1",
             "timeout_ms": 5000
-        }))
+        })
         assert result.success is True
 
-    def test_memory_parameter_accepted(self, tool):
+    async def test_memory_parameter_accepted(self, tool):
         """memory_mb parameter is accepted."""
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "1 + 1",
             "memory_mb": 256
-        }))
+        })
         assert result.success is True
 
 
 class TestSecurityLimitations:
     """Test that security limitations are enforced."""
 
-    def test_no_os_system(self, tool):
+    async def test_no_os_system(self, tool):
         """os.system is not available or fails."""
-        result = run_async(tool.execute({"code": "import os; os.system('ls')"}))
+        result = await tool.execute({"code": "import os; os.system('ls')"})
         # Should either fail or return non-zero/error
         # In Pyodide, os.system raises OSError or returns error
         assert result.success is False or "Error" in result.output or "error" in str(result.error).lower()
 
-    def test_no_subprocess(self, tool):
+    async def test_no_subprocess(self, tool):
         """subprocess module is not functional."""
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "import subprocess; subprocess.run(['ls'])"
-        }))
+        })
         # Should fail - subprocess doesn't work in WASM
         assert result.success is False or "Error" in (result.error or result.output)
 
-    def test_no_host_filesystem(self, tool):
+    async def test_no_host_filesystem(self, tool):
         """Cannot access host filesystem."""
-        result = run_async(tool.execute({"code": "open('/etc/passwd').read()"}))
+        result = await tool.execute({"code": "open('/etc/passwd').read()"})
         assert result.success is False
         # Should get FileNotFoundError or PermissionError
         assert "Error" in (result.error or result.output)
@@ -316,7 +447,7 @@ class TestSecurityLimitations:
 class TestP0Fixes:
     """Tests for P0 audit fixes (critical security/correctness issues)."""
 
-    def test_triple_quotes_in_code(self, tool):
+    async def test_triple_quotes_in_code(self, tool):
         # P0-B: Code containing triple quotes should work (base64 encoding).
         # Using string concatenation to avoid syntax issues in the test itself.
         code = (
@@ -326,57 +457,58 @@ class TestP0Fixes:
             "\n"
             'greet("World")'
         )
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         assert "Hello, World" in result.output
 
-    def test_triple_single_quotes_in_string(self, tool):
+    async def test_triple_single_quotes_in_string(self, tool):
         # P0-B: String containing ''' should work.
         code = "x = \"This string has triple single quotes: '''\"; x"
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         assert "'''" in result.output
 
-    def test_triple_single_quote_string_literal(self, tool):
+    async def test_triple_single_quote_string_literal(self, tool):
         # P0-B: Actual ''' as Python string delimiters - this is what broke before.
         # The old r'''${json}''' wrapper would terminate early on this.
         code = "x = '''multi\nline\nstring'''; x"
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         assert "multi" in result.output
 
-    def test_unicode_in_code(self, tool):
+    async def test_unicode_in_code(self, tool):
         """P0-B: Unicode characters in code should work."""
         code = '''
 # Comment with émojis: 🐍🎉
 greeting = "Héllo Wörld! 你好世界 🌍"
 greeting
 '''
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         assert "Héllo" in result.output or "Hello" in result.output  # May normalize
 
-    def test_backslashes_in_code(self, tool):
+    async def test_backslashes_in_code(self, tool):
         """P0-B: Backslashes should be preserved correctly."""
         code = r'''
 import re
 pattern = r"\d+\.\d+"
 re.findall(pattern, "3.14 and 2.71")
 '''
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         assert "3.14" in result.output
 
-    def test_timeout_recovery(self, tool):
+    @_pytest.mark.slow
+    async def test_timeout_recovery(self, tool):
         """P0-A: After timeout, subsequent calls should work (process recovered)."""
         import time
         
         # First call: infinite loop that will timeout
         start = time.time()
-        result1 = run_async(tool.execute({
+        result1 = await tool.execute({
             "code": "while True: pass",
             "timeout_ms": 1000  # 1 second timeout
-        }))
+        })
         elapsed = time.time() - start
         
         assert result1.success is False
@@ -386,7 +518,7 @@ re.findall(pattern, "3.14 and 2.71")
         assert 0.8 < elapsed < 5.0, f"Timeout took unexpected time: {elapsed}s"
 
         # Second call: should work because process was killed and respawned
-        result2 = run_async(tool.execute({"code": "2 + 2"}))
+        result2 = await tool.execute({"code": "2 + 2"})
         assert result2.success is True
         assert "4" in result2.output
 
@@ -394,13 +526,13 @@ re.findall(pattern, "3.14 and 2.71")
 class TestP1Fixes:
     """Tests for P1 audit fixes (important security improvements)."""
 
-    def test_output_truncation_at_source(self, tool):
+    async def test_output_truncation_at_source(self, tool):
         """P1-2.1: Large output should be truncated at source by _LimitedStringIO."""
         # Generate output larger than 10000 chars (LimitedStringIO limit)
         # LimitedStringIO limit (10000) is less than python_sandbox._truncate (12000)
         # so the truncation message remains visible.
         code = "print('x' * 20000)"
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert result.success is True
         # The key assertion: LimitedStringIO adds this SPECIFIC message
         # If this message is present, we KNOW truncation happened in the wrapper
@@ -408,25 +540,34 @@ class TestP1Fixes:
         # Double-check: output should be bounded
         assert len(result.output) < 12500  # 10000 + message + formatting overhead
 
-    def test_file_count_limit(self, tool):
+    async def test_result_truncation_at_source(self, tool):
+        """Large result reprs are capped by the runner using the tool's output limit."""
+        result = await tool.execute({"code": "'y' * 50000"})
+        assert result.success is True
+        assert "truncated at source" in result.output
+        assert len(result.output) < 12500
+
+    async def test_file_count_limit(self, tool):
         """P1-2.5: Too many files should be rejected."""
         # Create 101 files (limit is 100)
         files = {f"file{i}.txt": "content" for i in range(101)}
-        result = run_async(tool.execute({
+        result = await tool.execute({
             "code": "1",
             "files": files
-        }))
+        })
         assert result.success is False
         assert "too many files" in (result.error or "").lower()
 
-    def test_file_size_limit(self, tool):
+    async def test_file_size_limit(self, tool):
         """P1-2.5: File larger than 1MB should be rejected."""
-        # Create a file larger than 1MB
-        large_content = "x" * (1_000_001)
-        result = run_async(tool.execute({
+        # Create a file larger than 1MB. Bytes are size-checked by len() and rejected
+        # before any decode or serialization, so this is the only full-size buffer.
+        large_content = b"x" * 1_000_001
+        result = await tool.execute({
             "code": "1",
             "files": {"large.txt": large_content}
-        }))
+        })
+        del large_content
         assert result.success is False
         assert "too large" in (result.error or "").lower()
 
@@ -434,7 +575,7 @@ class TestP1Fixes:
 class TestDenoBoundary:
     """P1-2.6: Tests that verify Deno permission boundaries."""
 
-    def test_deno_read_outside_allowed_blocked(self, tool):
+    async def test_deno_read_outside_allowed_blocked(self, tool):
         """Deno should not be able to read files outside allowed paths."""
         # Try to read /etc/passwd via Deno's JS API
         code = """
@@ -445,13 +586,13 @@ try:
 except Exception as e:
     print(f"OK: {type(e).__name__}: {str(e)[:100]}")
 """
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         # Should either fail or print OK (permission denied)
         assert "FAIL" not in result.output
         # Either prints OK or the whole thing fails
         assert result.success is False or "OK:" in result.output
 
-    def test_deno_write_blocked(self, tool):
+    async def test_deno_write_blocked(self, tool):
         """Deno should not be able to write to host filesystem."""
         code = """
 try:
@@ -461,10 +602,10 @@ try:
 except Exception as e:
     print(f"OK: {type(e).__name__}")
 """
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         assert "FAIL" not in result.output
 
-    def test_network_blocked_by_default(self, tool):
+    async def test_network_blocked_by_default(self, tool):
         """Network access should be blocked by default."""
         # fetch may be available as a symbol but should fail when actually called
         code = """
@@ -480,7 +621,7 @@ async def try_fetch():
 
 print(asyncio.get_event_loop().run_until_complete(try_fetch()))
 """
-        result = run_async(tool.execute({"code": code}))
+        result = await tool.execute({"code": code})
         # Either the fetch call fails or we get a permission error
         assert "FAIL" not in result.output or result.success is False
 